@@ -0,0 +1,180 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from cache import CACHE_DIR, audio_digest
+from config import get_setting
+from fetch import CHUNK_SIZE, SpooledAudio, open_audio
+
+FFMPEG = get_setting("FFMPEG_BINARY", "ffmpeg")
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+# ffmpeg output arguments and file extension for each pre-processing codec
+CODECS = {
+    "opus": (
+        ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"],
+        ".ogg",
+    ),
+    "flac": (["-c:a", "flac", "-f", "flac"], ".flac"),
+}
+PREPROCESSED_DIR = os.path.join(CACHE_DIR, "audio")
+PREPROCESSED_MAX_BYTES = int(get_setting("AUDIO_CACHE_MAX_BYTES", 1024**3))
+# Transcodes still being written; never pruned
+PARTIAL_SUFFIX = ".partial"
+
+
+@contextmanager
+def ffmpeg_pipe(fileobj, output_args: List[str]):
+    """Run ffmpeg on ``fileobj`` and yield its stdout.
+
+    The input is copied to a scratch file in chunks first, so ffmpeg can
+    seek in containers whose index sits at the end (MP4, M4A) and neither
+    the encoded input nor the decoded output has to fit in memory. Any
+    error ffmpeg reports, or output without a single audio packet, raises
+    ``RuntimeError`` once the output has been read.
+    """
+    fileobj.seek(0)
+    with tempfile.TemporaryDirectory() as scratch:
+        source = os.path.join(scratch, "input" + os.path.splitext(fileobj.name)[1])
+        with open(source, "wb") as copy:
+            shutil.copyfileobj(fileobj, copy, CHUNK_SIZE)
+        process = subprocess.Popen(
+            [
+                FFMPEG,
+                "-nostdin",
+                "-loglevel",
+                "error",
+                "-i",
+                source,
+                "-abort_on",
+                "empty_output",
+                *output_args,
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            yield process.stdout
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            returncode = process.wait()
+    # Truncated or unreadable input can still exit 0 at -loglevel error,
+    # with only a demuxing error on stderr
+    if returncode != 0 or stderr.strip():
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
+
+def decode_pcm(fileobj, sample_rate: int = SAMPLE_RATE) -> Iterator[bytes]:
+    """Decode any audio or video container to mono 16-bit PCM, chunk by chunk."""
+    decoded = 0
+    with ffmpeg_pipe(
+        fileobj, ["-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"]
+    ) as stdout:
+        for chunk in iter(lambda: stdout.read(CHUNK_SIZE), b""):
+            decoded += len(chunk)
+            yield chunk
+    if not decoded:
+        raise RuntimeError(f"ffmpeg decoded no audio from {fileobj.name}")
+
+
+def wav_file(pcm: bytes, name: str, sample_rate: int = SAMPLE_RATE) -> io.BytesIO:
+    """Wrap mono 16-bit PCM in an in-memory, named WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+def _prune(directory: str, max_bytes: int) -> None:
+    """Delete the least recently used files until ``directory`` fits ``max_bytes``."""
+    entries = [
+        entry
+        for entry in os.scandir(directory)
+        if entry.is_file() and not entry.name.endswith(PARTIAL_SUFFIX)
+    ]
+    total = sum(entry.stat().st_size for entry in entries)
+    for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+        if total <= max_bytes:
+            break
+        total -= entry.stat().st_size
+        os.remove(entry.path)
+
+
+def encode(fileobj, stem: str, codec: str) -> io.BytesIO:
+    """Re-encode ``fileobj`` with ``codec`` into an in-memory, named file."""
+    output_args, extension = CODECS[codec]
+    buffer = io.BytesIO()
+    with ffmpeg_pipe(fileobj, [*output_args, "pipe:1"]) as stdout:
+        shutil.copyfileobj(stdout, buffer, CHUNK_SIZE)
+    buffer.seek(0)
+    buffer.name = stem + extension
+    return buffer
+
+
+def transcode(fileobj, path: str, codec: str = "opus") -> None:
+    """Strip video, downmix to mono, resample to 16 kHz and re-encode to ``path``.
+
+    Input and output are both streamed through ffmpeg, so the decoded PCM
+    is never held in memory.
+    """
+    output_args, _ = CODECS[codec]
+    # A private temp file per call, so two sessions shrinking the same
+    # recording never write into one file; only a complete one is renamed
+    fd, partial = tempfile.mkstemp(suffix=PARTIAL_SUFFIX, dir=os.path.dirname(path))
+    args = ["-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), *output_args, "pipe:1"]
+    try:
+        with open(fd, "wb") as out, ffmpeg_pipe(fileobj, args) as stdout:
+            shutil.copyfileobj(stdout, out, CHUNK_SIZE)
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+
+
+@contextmanager
+def prepare_audio(source, codec: Optional[str] = None):
+    """Yield the recording, shrunk with ``codec`` first when one is given.
+
+    Shrunk copies are kept on disk by the hash of the original, so reruns
+    reuse them. The yielded file's ``original_size`` and the size of its
+    contents give the byte reduction.
+    """
+    if codec is None:
+        yield source
+        return
+    _, extension = CODECS[codec]
+    with open_audio(source) as original:
+        original_size = original.seek(0, os.SEEK_END)
+        os.makedirs(PREPROCESSED_DIR, exist_ok=True)
+        path = os.path.join(PREPROCESSED_DIR, audio_digest(original) + extension)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            transcode(original, path, codec)
+            _prune(PREPROCESSED_DIR, PREPROCESSED_MAX_BYTES)
+    stem = os.path.splitext(os.path.basename(original.name))[0]
+    with SpooledAudio(stem + extension) as audio, open(path, "rb") as shrunk:
+        shutil.copyfileobj(shrunk, audio, CHUNK_SIZE)
+        audio.original_size = original_size
+        print(
+            f"- Pre-processed {original.name}: {original_size / 1e6:.1f} MB -> "
+            f"{audio.tell() / 1e6:.1f} MB"
+        )
+        audio.seek(0)
+        yield audio
@@ -0,0 +1,253 @@
+"""Process a manifest of recordings without the Streamlit UI.
+
+Each manifest line is a JSON object such as
+``{"id": "standup-03", "source": "recordings/standup-03.webm"}`` (a local
+path or a URL; ``provider``, ``generator`` and ``prompt`` override the
+command-line defaults for that line) or just a bare path or URL. Every
+recording is transcribed, turned into a PRD and scored, and one JSON line
+per recording is appended to the output file. Recordings already written
+there successfully are skipped, so an interrupted run resumes where it
+stopped.
+
+    python batch.py manifest.jsonl -o results.jsonl --provider Deepgram
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+from chunking import transcribe_chunked
+from dispatch import transcribe
+from generators import GENERATORS
+from mapreduce import MAP_PROMPT_NAME
+from pipeline import SCORING_MODEL, PrdPipeline
+from prompt_library import PromptLibrary
+from ratelimit import get_limiter
+from templates import DEFAULT_POLICY, POLICIES
+from transcribers import PROVIDERS
+
+WORKERS = 4
+
+
+def read_manifest(path: str) -> List[Dict]:
+    """Jobs from a JSONL manifest; lines may also be bare paths or URLs."""
+    jobs = []
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            job = json.loads(line) if line.startswith("{") else {"source": line}
+            if "source" not in job:
+                raise ValueError(f"{path}:{number}: manifest entry has no 'source'")
+            job.setdefault("id", job["source"])
+            jobs.append(job)
+    return jobs
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids of jobs already written successfully to the output file."""
+    done = set()
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return done
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash; the job is redone
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+class ResultWriter:
+    """Appends result lines and syncs each one so a crash loses at most one job."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict) -> None:
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+@contextmanager
+def open_source(source: str) -> Iterator:
+    """A URL as-is, or a local recording opened for reading."""
+    if source.startswith(("http://", "https://")):
+        yield source
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+def run_job(
+    job: Dict,
+    library: PromptLibrary,
+    provider: str,
+    generator: str,
+    prompt_name: str,
+    policy: str,
+    segment_minutes: float,
+) -> Dict:
+    """Transcribe one recording, generate its PRD and score it."""
+    provider = job.get("provider", provider)
+    generator = job.get("generator", generator)
+    prompt_name = job.get("prompt", prompt_name)
+    record = {
+        "id": job["id"],
+        "source": job["source"],
+        "provider": provider,
+        "generator": generator,
+        "prompt": prompt_name,
+    }
+    seconds: Dict[str, float] = {}
+    try:
+        prompt = library.get_prompt(prompt_name)
+        if prompt is None:
+            raise KeyError(f"No prompt named {prompt_name!r} in the library")
+
+        start = time.perf_counter()
+        with open_source(job["source"]) as source:
+            if segment_minutes:
+                transcript = transcribe_chunked(
+                    provider, source, target=segment_minutes * 60
+                ).text
+            else:
+                transcript = transcribe(provider, source)
+        seconds["transcribe"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pipeline = PrdPipeline(
+            generator,
+            transcript,
+            prompt,
+            library.get_prompt("Scoring"),
+            policy=policy,
+            map_prompt=library.get_prompt(MAP_PROMPT_NAME),
+        )
+        prd = "".join(pipeline.stream_prd())
+        llm_score = "".join(pipeline.stream_llm_score())
+        seconds["prd"] = time.perf_counter() - start
+    except Exception as e:
+        print(f"- {job['id']} failed: {e}")
+        record.update(status="error", error=str(e), seconds=seconds)
+        return record
+    record.update(
+        status="ok",
+        transcript=transcript,
+        prd=prd,
+        score=pipeline.local_score,
+        llm_score=llm_score,
+        seconds=seconds,
+    )
+    return record
+
+
+def run_batch(
+    manifest: str,
+    output: str,
+    provider: str = "Deepgram",
+    generator: str = "Gemini",
+    prompt_name: Optional[str] = None,
+    policy: str = DEFAULT_POLICY,
+    workers: int = WORKERS,
+    provider_limit: Optional[int] = None,
+    segment_minutes: float = 0,
+    prompts_path: str = "prompts.json",
+) -> Dict[str, int]:
+    """Run every manifest job not yet in ``output``; returns counts by status.
+
+    Without ``prompt_name`` the library's first prompt is used, as on the
+    PRD page. Calls to each provider go through its rate limiter;
+    ``provider_limit`` overrides the configured concurrency of every
+    provider the batch uses.
+    """
+    jobs = read_manifest(manifest)
+    done = completed_ids(output)
+    pending = [job for job in jobs if job["id"] not in done]
+    if provider_limit:
+        names = {provider, generator, SCORING_MODEL}
+        for job in pending:
+            names.update(job[key] for key in ("provider", "generator") if key in job)
+        for name in names:
+            get_limiter(name).concurrency = provider_limit
+    print(f"- {len(jobs)} jobs, {len(jobs) - len(pending)} already done")
+    library = PromptLibrary(prompts_path)
+    if prompt_name is None:
+        prompt_name = library.list_prompts()[0]["name"]
+    writer = ResultWriter(output)
+    counts = {"ok": 0, "error": 0, "skipped": len(jobs) - len(pending)}
+    with ThreadPoolExecutor(workers, thread_name_prefix="batch") as pool:
+        futures = [
+            pool.submit(
+                run_job,
+                job,
+                library,
+                provider,
+                generator,
+                prompt_name,
+                policy,
+                segment_minutes,
+            )
+            for job in pending
+        ]
+        for number, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            writer.write(record)
+            counts[record["status"]] += 1
+            print(f"- [{number}/{len(pending)}] {record['id']}: {record['status']}")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", help="JSONL file of recordings to process")
+    parser.add_argument("-o", "--output", default="results.jsonl")
+    parser.add_argument("--provider", default="Deepgram", choices=sorted(PROVIDERS))
+    parser.add_argument("--generator", default="Gemini", choices=sorted(GENERATORS))
+    parser.add_argument("--prompt", help="library prompt name (default: the first)")
+    parser.add_argument("--policy", default=DEFAULT_POLICY, choices=POLICIES)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument(
+        "--provider-limit",
+        type=int,
+        help="concurrent calls per provider (default: <NAME>_MAX_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--segment-minutes",
+        type=float,
+        default=0,
+        help="split long recordings into segments of about this length",
+    )
+    parser.add_argument("--prompts", default="prompts.json")
+    args = parser.parse_args(argv)
+    counts = run_batch(
+        args.manifest,
+        args.output,
+        args.provider,
+        args.generator,
+        args.prompt,
+        args.policy,
+        args.workers,
+        args.provider_limit,
+        args.segment_minutes,
+        args.prompts,
+    )
+    print(f"- Done: {counts}")
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
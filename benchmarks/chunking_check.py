@@ -0,0 +1,89 @@
+"""Offline checks of the long-recording splitter and stitcher.
+
+Synthetic audio (tone bursts separated by silences) exercises silence
+detection and segment planning; hand-written segment transcripts exercise
+stitching. Nothing is decoded or sent to a provider:
+
+    python benchmarks/chunking_check.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import SAMPLE_RATE  # noqa: E402
+from chunking import (  # noqa: E402
+    Segment,
+    find_silences,
+    frame_levels,
+    plan_segments,
+    stitch,
+)
+
+
+def synthetic_audio(pattern):
+    """16-bit samples of (seconds, loud) spans: a 440 Hz tone or silence."""
+    spans = []
+    for seconds, loud in pattern:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        tone = 0.5 * np.sin(2 * np.pi * 440 * t) if loud else np.zeros_like(t)
+        spans.append((tone * 32767).astype("<i2"))
+    return np.concatenate(spans)
+
+
+def check_silences() -> None:
+    samples = synthetic_audio([(5, True), (1, False), (5, True), (0.1, False)])
+    silences = find_silences(frame_levels(samples))
+    assert len(silences) == 1, silences
+    start, end = silences[0]
+    assert abs(start - 5) < 0.05 and abs(end - 6) < 0.05, silences
+
+
+def check_plan() -> None:
+    # Cuts move to the silences at 28 s and 61.5 s; the last one has none near
+    segments = plan_segments(100, [(27, 29), (61, 62)], target=30, overlap=2)
+    assert segments == [(0, 30), (26, 63.5), (59.5, 93.5), (89.5, 100)], segments
+    assert plan_segments(30, [], target=30) == [(0, 30)]
+
+
+def check_stitch(previous: str, following: str, expected: str) -> None:
+    text = stitch([Segment(0, 12, previous), Segment(10, 20, following)]).text
+    assert text == expected, f"{text!r} != {expected!r}"
+
+
+def main() -> None:
+    check_silences()
+    check_plan()
+    # Words heard twice in the overlap are kept once
+    check_stitch(
+        "the dashboard must load in under two",
+        "load in under two seconds for every user",
+        "the dashboard must load in under two seconds for every user",
+    )
+    # A word cut off at the boundary is replaced by the next segment's
+    check_stitch(
+        "admins must manage the ro",
+        "must manage the roles and permissions",
+        "admins must manage the roles and permissions",
+    )
+    # An overlap in silence shares no words: both sides are kept
+    check_stitch(
+        "we should ship it",
+        "next we talk budget",
+        "we should ship it next we talk budget",
+    )
+    # A common phrase away from the boundary is not an overlap
+    check_stitch(
+        "we need to think of the users first and then ship it",
+        "later we will talk of the budget and the timeline",
+        "we need to think of the users first and then ship it "
+        "later we will talk of the budget and the timeline",
+    )
+    print("chunking checks passed")
+
+
+if __name__ == "__main__":
+    main()
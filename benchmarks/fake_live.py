@@ -0,0 +1,227 @@
+"""Local stand-in for the vendors' streaming WebSocket APIs, for the live mode.
+
+PCM frames sent to Deepgram's ``/v1/listen``, AssemblyAI's ``/v3/ws`` or a
+Gladia session's ``/v2/live/<id>`` are answered, in that vendor's message
+format, with the words of a known transcript at the pace of the audio
+received (``words_per_second`` per second of 16 kHz mono PCM): interim
+results while an utterance grows, a final result every
+``utterance_words`` words, and the rest when the client closes the
+stream. Gladia sessions are created over HTTP by ``fake_vendors``.
+
+Serve it and point the app at it:
+
+    python benchmarks/fake_live.py --port 9001
+
+or replay a recording through the live mode end to end, with the LLM
+answered by ``fake_vendors``, and see how soon the PRD draft is ready
+after the recording ends:
+
+    python benchmarks/fake_live.py --replay meeting.webm --provider Assembly --speed 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), HERE]
+
+from fake_vendors import TRANSCRIPT  # noqa: E402
+
+PCM_BYTES_PER_SECOND = 32_000  # 16 kHz, 16-bit, mono
+CLOSE_MESSAGES = {"CloseStream", "Terminate", "stop_recording"}
+
+
+def deepgram_result(text: str, start: float, end: float, is_final: bool) -> Dict:
+    return {
+        "type": "Results",
+        "channel": {"alternatives": [{"transcript": text}]},
+        "is_final": is_final,
+        "start": start,
+        "duration": end - start,
+    }
+
+
+def assembly_result(text: str, start: float, end: float, is_final: bool) -> Dict:
+    return {
+        "type": "Turn",
+        "transcript": text,
+        "end_of_turn": is_final,
+        "turn_is_formatted": is_final,
+        "words": [{"start": int(start * 1000), "end": int(end * 1000)}],
+    }
+
+
+def gladia_result(text: str, start: float, end: float, is_final: bool) -> Dict:
+    return {
+        "type": "transcript",
+        "data": {
+            "is_final": is_final,
+            "utterance": {"text": text, "start": start, "end": end},
+        },
+    }
+
+
+FORMATS: Dict[str, Callable[[str, float, float, bool], Dict]] = {
+    "/v1/listen": deepgram_result,
+    "/v3/ws": assembly_result,
+    "/v2/live/": gladia_result,
+}
+
+
+class FakeLiveTranscriber:
+    """WebSocket server replaying ``transcript`` as streamed audio arrives."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        transcript: str = TRANSCRIPT,
+        bytes_per_second: int = PCM_BYTES_PER_SECOND,
+        words_per_second: float = 2.5,
+        utterance_words: int = 8,
+    ):
+        from websockets.sync.server import serve
+
+        self.words = transcript.split()
+        self.bytes_per_second = bytes_per_second
+        self.words_per_second = words_per_second
+        self.utterance_words = utterance_words
+        self._server = serve(self._handle, host, port, max_size=None)
+        self.port = self._server.socket.getsockname()[1]
+        self.url = f"ws://{host}:{self.port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+
+    def settings(self) -> Dict[str, str]:
+        """Environment that points the live mode's WebSocket clients here."""
+        return {
+            "DEEPGRAM_LIVE_URL": f"{self.url}/v1/listen",
+            "ASSEMBLYAI_LIVE_URL": f"{self.url}/v3/ws",
+        }
+
+    def _handle(self, websocket) -> None:
+        path = websocket.request.path.split("?")[0]
+        formats = [fmt for prefix, fmt in FORMATS.items() if path.startswith(prefix)]
+        if not formats:
+            websocket.close(1008, f"no fake route for {path}")
+            return
+
+        def result(first: int, last: int, is_final: bool) -> str:
+            words = [self.words[i % len(self.words)] for i in range(first, last)]
+            return json.dumps(
+                formats[0](
+                    " ".join(words),
+                    first / self.words_per_second,
+                    last / self.words_per_second,
+                    is_final,
+                )
+            )
+
+        received = 0
+        spoken = 0  # words covered by the audio so far
+        utterance = 0  # index of the first word not yet finalized
+        for message in websocket:
+            if isinstance(message, str):
+                if json.loads(message).get("type") in CLOSE_MESSAGES:
+                    break
+                continue
+            received += len(message)
+            heard = int(received / self.bytes_per_second * self.words_per_second)
+            if heard == spoken:
+                continue
+            spoken = heard
+            while spoken - utterance >= self.utterance_words:
+                end = utterance + self.utterance_words
+                websocket.send(result(utterance, end, True))
+                utterance = end
+            if spoken > utterance:
+                websocket.send(result(utterance, spoken, False))
+        if spoken > utterance:
+            websocket.send(result(utterance, spoken, True))
+        websocket.send(json.dumps({"type": "Metadata", "bytes": received}))
+
+
+def replay(path: str, provider: str, speed: float, interval: float) -> Dict:
+    """Stream ``path`` through the live mode against local stand-ins."""
+    from fake_vendors import FakeVendors, settings
+
+    server = FakeLiveTranscriber()
+    vendors = FakeVendors(speed=0.2, live_url=server.url)
+    os.environ.update(settings(vendors.url))
+    os.environ.update(server.settings())
+    from live import LiveTranscriber, RollingDraft, audio_frames
+    from templates import CHARS_PER_TOKEN
+
+    prompt = {"name": "Replay", "content": "Write a PRD.\n\n{transcript}"}
+    updates: List[float] = []
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as audio:
+            transcriber = LiveTranscriber(audio_frames(audio, speed=speed), provider)
+            draft = RollingDraft("Gemini", prompt, interval=interval)
+            version = 0
+            for segment in transcriber.segments():
+                draft.add(segment)
+                if draft.version != version:
+                    version = draft.version
+                    updates.append(time.perf_counter() - start)
+            ended = time.perf_counter()
+            text = draft.finish()
+            finished = time.perf_counter()
+    finally:
+        server.shutdown()
+        vendors.shutdown()
+    return {
+        "audio_seconds": transcriber.bytes_sent / PCM_BYTES_PER_SECOND,
+        "streamed_seconds": ended - start,
+        "draft_updates": len(updates),
+        "first_draft_after": updates[0] if updates else None,
+        "draft_ready_after_end": finished - ended,
+        "draft_tokens": len(text) // CHARS_PER_TOKEN,
+        "transcript_words": len(transcriber.final_text.split()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--transcript", help="text file with the words to replay")
+    parser.add_argument("--replay", help="stream this recording through the live mode")
+    parser.add_argument(
+        "--provider", default="Deepgram", help="live provider to replay"
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up")
+    parser.add_argument(
+        "--interval", type=float, default=30, help="seconds of speech per draft update"
+    )
+    args = parser.parse_args()
+    if args.replay:
+        for name, value in replay(
+            args.replay, args.provider, args.speed, args.interval
+        ).items():
+            print(f"{name}: {value}")
+        return
+    transcript = TRANSCRIPT
+    if args.transcript:
+        with open(args.transcript) as f:
+            transcript = f.read()
+    server = FakeLiveTranscriber(port=args.port, transcript=transcript)
+    print(f"Fake live transcription listening on {server.url}")
+    for name, value in server.settings().items():
+        print(f"export {name}={value}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Local stand-ins for the transcription and LLM vendors, for offline benchmarks.
+
+One threaded HTTP server answers the routes the app's code and the vendor
+SDKs call, with simulated latency:
+
+- Gladia: upload, then a job that is polled until it is done
+- Deepgram, OpenAI Whisper and Groq: one synchronous upload and reply
+- AssemblyAI: upload, then a job that is polled until it is completed
+- Gemini and Together: streamed responses, one token every few milliseconds
+- Gladia live sessions: created here, streamed to ``fake_live`` at ``live_url``
+
+Latency is ``base + size / bandwidth`` for uploads plus a per-vendor
+processing time proportional to the audio size. ``speed`` scales every delay.
+
+    python benchmarks/fake_vendors.py --port 9000
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+TRANSCRIPT = (
+    "So the goal for this release is a dashboard that must load in under two "
+    "seconds. Users should be able to export reports, and admins must be able "
+    "to manage roles. We still need to decide on the timeline and budget. "
+)
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Simulated behaviour of one vendor."""
+
+    latency: float  # seconds before any reply
+    seconds_per_mb: float  # processing time per MB of audio
+    token_interval: float = 0.0  # seconds between streamed tokens
+
+
+PROFILES: Dict[str, Profile] = {
+    "gladia": Profile(0.05, 0.20),
+    "deepgram": Profile(0.05, 0.05),
+    "assemblyai": Profile(0.08, 0.25),
+    "openai": Profile(0.10, 0.15),
+    "groq": Profile(0.03, 0.02),
+    "gemini": Profile(0.20, 0.0, 0.005),
+    "together": Profile(0.30, 0.0, 0.008),
+}
+PRD_TOKENS = (
+    "## Goals\n",
+    "The dashboard must load in under two seconds. ",
+    "## Requirements\n",
+    "- Users should export reports\n",
+    "- Admins must manage roles\n",
+    "## Timeline\n",
+    "To be decided. ",
+) * 8
+
+
+class FakeVendors:
+    """Threaded server impersonating every vendor on one port."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        speed: float = 1.0,
+        live_url: Optional[str] = None,
+    ):
+        self.speed = speed
+        self.live_url = live_url
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        vendors = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    data = bytearray()
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return bytes(data)
+                        data += self.rfile.read(size)
+                        self.rfile.readline()
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _json(self, payload: Dict, status: int = 200) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunked(self, content_type: str, pieces) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for piece in pieces:
+                    data = piece.encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _sse(self, events) -> None:
+                self._chunked(
+                    "text/event-stream", (f"data: {event}\n\n" for event in events)
+                )
+
+            def _json_array(self, items) -> None:
+                """Stream a JSON array one element at a time, as Gemini's REST API does."""
+
+                def pieces():
+                    separator = "["
+                    for item in items:
+                        yield separator + json.dumps(item)
+                        separator = ",\r\n"
+                    yield "]" if separator != "[" else "[]"
+
+                self._chunked("application/json", pieces())
+
+            def do_GET(self):
+                vendors.route(self, "GET", b"")
+
+            def do_POST(self):
+                vendors.route(self, "POST", self._body())
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self.url = f"http://{host}:{self.port}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _sleep(self, seconds: float) -> None:
+        time.sleep(seconds * self.speed)
+
+    def _process(self, vendor: str, size: int) -> None:
+        profile = PROFILES[vendor]
+        self._sleep(profile.latency + size / 1e6 * profile.seconds_per_mb)
+
+    def _start_job(self, vendor: str, size: int) -> str:
+        profile = PROFILES[vendor]
+        job_id = uuid.uuid4().hex
+        ready = time.monotonic() + (size / 1e6 * profile.seconds_per_mb) * self.speed
+        with self._lock:
+            self._jobs[job_id] = {"ready": ready, "size": size}
+        return job_id
+
+    def _job_done(self, job_id: str) -> Optional[bool]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return time.monotonic() >= job["ready"]
+
+    def _tokens(self, vendor: str):
+        profile = PROFILES[vendor]
+        self._sleep(profile.latency)
+        for token in PRD_TOKENS:
+            self._sleep(profile.token_interval)
+            yield token
+
+    def route(self, handler, method: str, body: bytes) -> None:
+        path = handler.path.split("?")[0]
+        # Gladia
+        if path == "/v2/upload/":
+            self._process("gladia", 0)
+            handler._json(
+                {
+                    "audio_url": f"{self.url}/audio/{len(body)}",
+                    "audio_metadata": {"audio_duration": len(body) / 16000},
+                }
+            )
+        elif path == "/v2/transcription/" and method == "POST":
+            size = int(json.loads(body)["audio_url"].rsplit("/", 1)[1])
+            job_id = self._start_job("gladia", size)
+            handler._json(
+                {"id": job_id, "result_url": f"{self.url}/v2/transcription/{job_id}"}
+            )
+        elif path.startswith("/v2/transcription/"):
+            done = self._job_done(path.rsplit("/", 1)[1])
+            if done is None:
+                handler._json({"status": "error"}, 404)
+            elif not done:
+                handler._json({"status": "processing"})
+            else:
+                handler._json(
+                    {
+                        "status": "done",
+                        "result": {"transcription": {"full_transcript": TRANSCRIPT}},
+                    }
+                )
+        elif path == "/v2/live" and method == "POST":
+            session_id = uuid.uuid4().hex
+            handler._json(
+                {"id": session_id, "url": f"{self.live_url}/v2/live/{session_id}"}
+            )
+        # Deepgram
+        elif path == "/v1/listen":
+            self._process("deepgram", len(body))
+            handler._json(
+                {
+                    "results": {
+                        "channels": [{"alternatives": [{"transcript": TRANSCRIPT}]}]
+                    }
+                }
+            )
+        # OpenAI and Groq (OpenAI-compatible audio API)
+        elif path.endswith("/audio/transcriptions"):
+            vendor = "groq" if path.startswith("/openai/") else "openai"
+            self._process(vendor, len(body))
+            handler._json({"text": TRANSCRIPT})
+        # AssemblyAI
+        elif path == "/v2/upload":
+            self._process("assemblyai", 0)
+            handler._json({"upload_url": f"{self.url}/audio/{len(body)}"})
+        elif path == "/v2/transcript" and method == "POST":
+            audio_url = json.loads(body)["audio_url"]
+            job_id = self._start_job("assemblyai", int(audio_url.rsplit("/", 1)[1]))
+            with self._lock:
+                self._jobs[job_id]["audio_url"] = audio_url
+            handler._json({"id": job_id, "status": "queued", "audio_url": audio_url})
+        elif path.startswith("/v2/transcript/"):
+            job_id = path.rsplit("/", 1)[1]
+            done = self._job_done(job_id)
+            handler._json(
+                {
+                    "id": job_id,
+                    "audio_url": self._jobs[job_id]["audio_url"],
+                    "status": "completed" if done else "processing",
+                    "text": TRANSCRIPT if done else None,
+                }
+            )
+        # Gemini (REST transport, server-sent events)
+        elif re.search(r"/models/[^/]+:streamGenerateContent$", path):
+            handler._json_array(
+                {
+                    "candidates": [
+                        {
+                            "content": {"parts": [{"text": token}], "role": "model"},
+                            "index": 0,
+                        }
+                    ]
+                }
+                for token in self._tokens("gemini")
+            )
+        # Together (OpenAI-compatible chat API)
+        elif path.endswith("/chat/completions"):
+            events = (
+                json.dumps(
+                    {
+                        "id": "fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": "fake",
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": token},
+                                "finish_reason": None,
+                            }
+                        ],
+                    }
+                )
+                for token in self._tokens("together")
+            )
+            handler._sse(_with_done(events))
+        else:
+            handler._json({"error": f"no fake route for {method} {path}"}, 404)
+
+
+def _with_done(events):
+    yield from events
+    yield "[DONE]"
+
+
+def settings(url: str) -> Dict[str, str]:
+    """Environment that points the app and every vendor SDK at ``url``."""
+    return {
+        "GLADIA_API_URL": url,
+        "DEEPGRAM_BASE_URL": url,
+        "OPENAI_BASE_URL": f"{url}/v1",
+        "GROQ_BASE_URL": url,
+        "ASSEMBLYAI_BASE_URL": url,
+        "GEMINI_BASE_URL": url,
+        "TOGETHER_BASE_URL": f"{url}/v1",
+        "GLADIA_API_KEY": "fake",
+        "secret": "fake",
+        "OPENAI_API_KEY": "fake",
+        "GROQ": "fake",
+        "ASSEMBLY_API_KEY": "fake",
+        "GEMINI_API_KEY": "fake",
+        "TG_API_TOKEN": "fake",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--live-url", help="fake_live server for Gladia live sessions")
+    args = parser.parse_args()
+    vendors = FakeVendors(port=args.port, speed=args.speed, live_url=args.live_url)
+    print(f"Fake vendors listening on {vendors.url}")
+    for name, value in settings(vendors.url).items():
+        print(f"export {name}={value}")
+    try:
+        vendors._thread.join()
+    except KeyboardInterrupt:
+        vendors.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Cold-start import time of the app's modules, with and without the vendor SDKs.
+
+Each measurement runs in a fresh interpreter, like a new Streamlit
+process, and the median of ``--runs`` is reported:
+
+    python benchmarks/import_time.py --runs 5
+
+"app modules" is what page1.py imports now that SDKs load lazily; "app +
+all SDKs" adds the six SDK imports the page used to pay for up front.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_MODULES = [
+    "audio",
+    "cache",
+    "chunking",
+    "clients",
+    "dispatch",
+    "generators",
+    "mapreduce",
+    "pipeline",
+    "prompt_library",
+    "ratelimit",
+    "templates",
+    "transcribers",
+]
+SDK_MODULES = [
+    "google.generativeai",
+    "groq",
+    "assemblyai",
+    "openai",
+    "deepgram",
+    "together",
+]
+SCENARIOS = {
+    "streamlit only": ["streamlit"],
+    "app modules": ["streamlit", *APP_MODULES],
+    "app + all SDKs": ["streamlit", *APP_MODULES, *SDK_MODULES],
+}
+
+SNIPPET = """
+import importlib, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(time.perf_counter() - start)
+"""
+
+
+def measure(modules, runs: int) -> float:
+    """Median seconds to import ``modules`` in a fresh interpreter."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", SNIPPET, *modules],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    results = {name: measure(modules, args.runs) for name, modules in SCENARIOS.items()}
+    for name, seconds in results.items():
+        print(f"{name:<16} {seconds * 1000:8.0f} ms")
+    saved = results["app + all SDKs"] - results["app modules"]
+    print(f"{'lazy SDKs save':<16} {saved * 1000:8.0f} ms per cold start")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Offline benchmark of the transcription and PRD pipeline against fake vendors.
+
+Starts ``fake_vendors.FakeVendors`` on a local port, then runs each
+scenario in a fresh interpreter pointed at it, so peak RSS is per scenario
+and no cache or client is shared between them:
+
+- ``transcribe``: each provider, for every audio size and concurrency level
+- ``generate``: each LLM, streaming a PRD from a transcript
+- ``pipeline``: transcribe -> PRD -> LLM score, end to end
+
+Every request uses different audio or prompt text, so the caches never
+answer for the vendor. Results are printed as a table and can be saved
+as JSON to compare runs:
+
+    python benchmarks/pipeline_bench.py --sizes 1,8 --concurrency 1,4 --json before.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+
+TRANSCRIBERS = ["Gladia", "Deepgram", "Assembly", "Whisper", "Groq"]
+GENERATORS = ["Gemini", "TogetherAI"]
+PROMPT = {
+    "name": "Benchmark",
+    "content": "Write a PRD from this meeting transcript.\n\n{transcript}",
+}
+SCORING_PROMPT = {
+    "name": "Benchmark scoring",
+    "content": "Score this PRD.\n\n{transcript}",
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def make_recordings(directory: str, count: int, megabytes: float) -> List[str]:
+    """Write ``count`` distinct fake recordings of the given size."""
+    block = os.urandom(1024 * 1024)
+    size = int(megabytes * 1024 * 1024)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"recording-{index:04d}.webm")
+        with open(path, "wb") as f:
+            f.write(os.urandom(16))
+            remaining = size - 16
+            while remaining > 0:
+                f.write(block[: min(remaining, len(block))])
+                remaining -= len(block)
+        paths.append(path)
+    return paths
+
+
+def run_scenario(scenario: Dict) -> Dict:
+    """Run one scenario in this process; called in the worker interpreter."""
+    from dispatch import transcribe
+    from generators import stream_text
+    from pipeline import PrdPipeline
+
+    kind = scenario["kind"]
+    count = scenario["requests"]
+    with tempfile.TemporaryDirectory() as directory:
+        recordings = (
+            make_recordings(directory, count, scenario["size_mb"])
+            if kind != "generate"
+            else []
+        )
+        run_id = f"{time.time_ns()}"
+
+        def task(index: int) -> float:
+            start = time.perf_counter()
+            if kind == "transcribe":
+                with open(recordings[index], "rb") as audio:
+                    transcribe(scenario["provider"], audio)
+            elif kind == "generate":
+                text = PROMPT["content"].format(
+                    transcript=f"Run {run_id}, meeting {index}: dashboards and roles."
+                )
+                for _ in stream_text(scenario["generator"], text):
+                    pass
+            else:
+                with open(recordings[index], "rb") as audio:
+                    transcript = transcribe(scenario["provider"], audio)
+                pipeline = PrdPipeline(
+                    scenario["generator"],
+                    f"Run {run_id}, meeting {index}: {transcript}",
+                    PROMPT,
+                    SCORING_PROMPT,
+                )
+                for _ in pipeline.stream_prd():
+                    pass
+                for _ in pipeline.stream_llm_score():
+                    pass
+            return time.perf_counter() - start
+
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(scenario["concurrency"]) as pool:
+            futures = [pool.submit(task, index) for index in range(count)]
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception as e:
+                    errors += 1
+                    print(f"request failed: {e}", file=sys.stderr)
+        wall = time.perf_counter() - start
+    return {
+        **scenario,
+        "ok": len(latencies),
+        "errors": errors,
+        "seconds": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "throughput_mbps": len(latencies) * scenario.get("size_mb", 0) / wall,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def scenarios(args) -> List[Dict]:
+    sizes = [float(size) for size in args.sizes.split(",")]
+    generators = args.generators.split(",")
+    plans = []
+    for level in (int(level) for level in args.concurrency.split(",")):
+        for provider in args.providers.split(","):
+            for size in sizes:
+                plans.append(
+                    {
+                        "kind": "transcribe",
+                        "provider": provider,
+                        "size_mb": size,
+                        "concurrency": level,
+                    }
+                )
+        for generator in generators:
+            plans.append(
+                {
+                    "kind": "generate",
+                    "generator": generator,
+                    "size_mb": 0,
+                    "concurrency": level,
+                }
+            )
+        for size in sizes:
+            plans.append(
+                {
+                    "kind": "pipeline",
+                    "provider": args.pipeline_provider,
+                    "generator": generators[0],
+                    "size_mb": size,
+                    "concurrency": level,
+                }
+            )
+    for plan in plans:
+        plan["requests"] = max(args.requests, plan["concurrency"])
+    return plans
+
+
+def spawn(scenario: Dict, url: str, verbose: bool) -> Dict:
+    """Run ``scenario`` in a fresh interpreter configured for the fake vendors."""
+    from fake_vendors import settings
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        result_path = os.path.join(cache_dir, "result.json")
+        env = {
+            **os.environ,
+            **settings(url),
+            "CACHE_DIR": cache_dir,
+            # Measure the pipeline itself, not the rate limiter's default cap
+            "PROVIDER_MAX_CONCURRENCY": str(scenario["concurrency"]),
+        }
+        output = None if verbose else subprocess.DEVNULL
+        subprocess.run(
+            [sys.executable, __file__, "--worker", json.dumps(scenario), result_path],
+            cwd=ROOT,
+            env=env,
+            stdout=output,
+            stderr=output,
+            check=True,
+        )
+        with open(result_path) as f:
+            return json.load(f)
+
+
+HEADER = (
+    f"{'scenario':<10} {'vendor':<20} {'MB':>5} {'conc':>4} {'ok':>4} {'err':>3} "
+    f"{'req/s':>7} {'MB/s':>7} {'p50 s':>7} {'p99 s':>7} {'RSS MB':>7}"
+)
+
+
+def format_row(r: Dict) -> str:
+    vendor = "+".join(filter(None, (r.get("provider"), r.get("generator"))))
+    return (
+        f"{r['kind']:<10} {vendor:<20} {r['size_mb']:>5g} {r['concurrency']:>4} "
+        f"{r['ok']:>4} {r['errors']:>3} {r['throughput_rps']:>7.2f} "
+        f"{r['throughput_mbps']:>7.2f} {r['p50']:>7.3f} {r['p99']:>7.3f} "
+        f"{r['peak_rss_mb']:>7.1f}"
+    )
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        result = run_scenario(json.loads(sys.argv[2]))
+        with open(sys.argv[3], "w") as f:
+            json.dump(result, f)
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,8", help="audio sizes in MB")
+    parser.add_argument("--concurrency", default="1,4", help="concurrent requests")
+    parser.add_argument("--requests", type=int, default=8, help="per scenario")
+    parser.add_argument("--providers", default=",".join(TRANSCRIBERS))
+    parser.add_argument("--generators", default=",".join(GENERATORS))
+    parser.add_argument("--pipeline-provider", default="Deepgram")
+    parser.add_argument("--speed", type=float, default=1.0, help="scale fake latency")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show worker output")
+    args = parser.parse_args()
+
+    from fake_vendors import FakeVendors
+
+    vendors = FakeVendors(speed=args.speed)
+    results = []
+    print(HEADER)
+    print("-" * len(HEADER))
+    try:
+        for scenario in scenarios(args):
+            results.append(spawn(scenario, vendors.url, args.verbose))
+            print(format_row(results[-1]), flush=True)
+    finally:
+        vendors.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
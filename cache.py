@@ -0,0 +1,285 @@
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from config import get_setting
+from fetch import CHUNK_SIZE, open_audio
+from http_client import request
+from metrics import inc
+
+CACHE_DIR = get_setting("CACHE_DIR", ".cache")
+
+
+class DiskCache:
+    """SQLite-backed key/value store with least-recently-used eviction.
+
+    The database is opened in WAL mode so every Streamlit worker on the
+    machine can share it. Once the stored values exceed ``max_bytes`` the
+    least recently read entries are dropped; with ``ttl`` set, entries
+    older than ``ttl`` seconds are treated as missing. Entries may carry a
+    tag so related ones can be dropped together.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+            )
+            columns = {row[1] for row in db.execute("PRAGMA table_info(entries)")}
+            if "tag" not in columns:
+                db.execute("ALTER TABLE entries ADD COLUMN tag TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _oldest(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        inc("cache_requests_total", cache=self.name, result="hit" if hit else "miss")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the value stored under ``key`` and mark it recently used."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT value FROM entries WHERE key = ? AND created >= ?",
+                (key, self._oldest()),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+        self._count(row is not None)
+        return row[0] if row is not None else None
+
+    def contains(self, key: str) -> bool:
+        """Whether ``key`` holds a live entry, without counting a hit or miss."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT 1 FROM entries WHERE key = ? AND created >= ?",
+                (key, self._oldest()),
+            ).fetchone()
+        return row is not None
+
+    def set(self, key: str, value: str, tag: Optional[str] = None) -> None:
+        """Store ``value`` under ``key`` and evict old entries if over budget."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, value, size, created, last_used, tag) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, len(value.encode()), now, now, tag),
+            )
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def delete_tag(self, tag: str) -> int:
+        """Drop every entry stored with ``tag``."""
+        with self._connect() as db:
+            return db.execute("DELETE FROM entries WHERE tag = ?", (tag,)).rowcount
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under ``max_bytes``."""
+        with self._connect() as db:
+            expired = 0
+            if self.ttl:
+                expired = db.execute(
+                    "DELETE FROM entries WHERE created < ?", (self._oldest(),)
+                ).rowcount
+            (total,) = db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            excess = total - self.max_bytes
+            if excess <= 0:
+                return expired
+            removed = 0
+            rows = db.execute("SELECT key, size FROM entries ORDER BY last_used")
+            doomed = []
+            for key, size in rows:
+                if removed >= excess:
+                    break
+                doomed.append((key,))
+                removed += size
+            db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        return expired + len(doomed)
+
+    def clear(self) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """Hits and misses seen by this process, plus the entries stored."""
+        with self._connect() as db:
+            entries, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+transcript_cache = DiskCache(
+    os.path.join(CACHE_DIR, "transcripts.sqlite"),
+    max_bytes=int(get_setting("TRANSCRIPT_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+)
+completion_cache = DiskCache(
+    os.path.join(CACHE_DIR, "completions.sqlite"),
+    max_bytes=int(get_setting("COMPLETION_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    ttl=float(get_setting("COMPLETION_CACHE_TTL", 7 * 24 * 3600)),
+)
+# Audio hash of each recently fetched link, so a rerun neither asks the
+# server for validators nor downloads the recording again to hash it
+link_cache = DiskCache(
+    os.path.join(CACHE_DIR, "links.sqlite"),
+    max_bytes=4 * 1024 * 1024,
+    ttl=float(get_setting("LINK_CACHE_TTL", 600)),
+)
+
+
+def audio_digest(fileobj) -> str:
+    """SHA-256 of a recording, read in chunks so it never sits in memory."""
+    digest = getattr(fileobj, "sha256", None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    position = fileobj.tell()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        sha.update(chunk)
+    fileobj.seek(position)
+    return sha.hexdigest()
+
+
+def _url_alias(url: str) -> Optional[str]:
+    """Cache key naming a remote recording by its HTTP validators, if it has any."""
+    try:
+        response = request("HEAD", url, allow_redirects=True)
+    except Exception:
+        return None
+    headers = response.headers
+    validators = [headers.get(name) for name in ("ETag", "Last-Modified")]
+    if not response.ok or not any(validators):
+        return None
+    validators.append(headers.get("Content-Length"))
+    return "url:" + json.dumps([response.url, *validators])
+
+
+def transcript_key(digest: str, provider: str, model: str, options=()) -> str:
+    return "transcript:" + json.dumps([digest, provider, model, list(options)])
+
+
+def stitched_key(
+    digest: str, provider: str, options=(), target: float = 0, overlap: float = 0
+) -> str:
+    """Cache key for a recording transcribed in segments and stitched together."""
+    return "stitched:" + json.dumps([digest, provider, list(options), target, overlap])
+
+
+def cached_transcript(provider: str, model: str = ""):
+    """Cache a transcriber's output by audio content, provider, model and options.
+
+    A link fetched in the last ``LINK_CACHE_TTL`` seconds is resolved to its
+    audio hash straight away; otherwise links whose server sends an ETag or
+    Last-Modified header are resolved without downloading them again.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(source, *options):
+            link = "link:" + source if isinstance(source, str) else None
+            digest = link_cache.get(link) if link else None
+            alias = None
+            if link and not digest:
+                alias = _url_alias(source)
+                digest = transcript_cache.get(alias) if alias else None
+                if digest:
+                    link_cache.set(link, digest)
+            if digest:
+                hit = transcript_cache.get(
+                    transcript_key(digest, provider, model, options)
+                )
+                if hit is not None:
+                    return hit
+            with open_audio(source) as audio:
+                digest = audio_digest(audio)
+                if link:
+                    link_cache.set(link, digest)
+                if alias:
+                    transcript_cache.set(alias, digest)
+                key = transcript_key(digest, provider, model, options)
+                hit = transcript_cache.get(key)
+                if hit is not None:
+                    return hit
+                text = func(audio, *options)
+            transcript_cache.set(key, text)
+            return text
+
+        return wrapper
+
+    return decorator
+
+
+def completion_key(model: str, text: str) -> str:
+    """Cache key for a model's completion of a fully rendered prompt."""
+    return "completion:" + hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+def invalidate_completions(change: Dict) -> None:
+    """Drop completions made with a prompt that was edited, replaced or deleted.
+
+    Subscribed to the prompt library. Keys hash the rendered prompt, so an
+    edited prompt could never hit an old entry anyway; this frees the space
+    right away instead of waiting for eviction.
+    """
+    op = change["op"]
+    if op == "put":
+        completion_cache.delete_tag(change["prompt"]["name"])
+    elif op in ("update", "delete"):
+        completion_cache.delete_tag(change["name"])
+    elif op == "clear":
+        completion_cache.clear()
@@ -0,0 +1,252 @@
+import difflib
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from audio import SAMPLE_RATE, SAMPLE_WIDTH, decode_pcm, encode, wav_file
+from cache import audio_digest, stitched_key, transcript_cache
+from dispatch import transcribe
+from fetch import SPOOL_MAX_SIZE, open_audio
+
+FRAME_SECONDS = 0.02
+SILENCE_DB = -40.0
+MIN_SILENCE = 0.3
+SEGMENT_SECONDS = 600.0
+OVERLAP_SECONDS = 2.0
+STITCH_WINDOW = 16  # words compared on each side of a segment boundary
+WORDS_PER_SECOND = 3  # generous speech rate, bounds the words an overlap can hold
+MAX_WORKERS = 4
+# Segments are sent as Opus: WAV runs at 32 kB/s, so a 20-minute segment
+# would be well over the providers' upload limit
+SEGMENT_CODEC = "opus"
+SEGMENT_BYTES_PER_SECOND = 4000  # 24 kb/s Opus plus Ogg overhead, rounded up
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024  # Whisper's and Groq's limit per file
+SEARCH_WINDOW = 0.25
+
+
+@dataclass
+class Segment:
+    """Transcript of one slice of a recording, in seconds from its start."""
+
+    start: float
+    end: float
+    text: str = ""
+
+
+@dataclass
+class StitchedTranscript:
+    text: str
+    segments: List[Segment]
+
+
+def frame_levels(
+    samples: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_seconds: float = FRAME_SECONDS,
+) -> np.ndarray:
+    """Loudness in dBFS of each frame of 16-bit samples."""
+    frame = int(sample_rate * frame_seconds)
+    count = len(samples) // frame
+    frames = samples[: count * frame].astype(np.float64).reshape(count, frame)
+    rms = np.sqrt(np.mean((frames / 32768.0) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def find_silences(
+    levels: np.ndarray,
+    threshold_db: float = SILENCE_DB,
+    min_silence: float = MIN_SILENCE,
+    frame_seconds: float = FRAME_SECONDS,
+) -> List[Tuple[float, float]]:
+    """(start, end) seconds of each quiet run lasting at least ``min_silence``."""
+    quiet = np.concatenate(([0], (levels < threshold_db).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(quiet))
+    min_frames = min_silence / frame_seconds
+    return [
+        (float(start * frame_seconds), float(end * frame_seconds))
+        for start, end in zip(edges[::2], edges[1::2])
+        if end - start >= min_frames
+    ]
+
+
+def plan_segments(
+    duration: float,
+    silences: Sequence[Tuple[float, float]],
+    target: float = SEGMENT_SECONDS,
+    overlap: float = OVERLAP_SECONDS,
+    window: float = SEARCH_WINDOW,
+) -> List[Tuple[float, float]]:
+    """Split ``duration`` seconds into overlapping segments of about ``target``.
+
+    Each cut moves to the middle of the silence closest to the ideal cut
+    point, searching ``window * target`` seconds either side; without one
+    the cut falls on the ideal point. Segments then extend ``overlap``
+    seconds past both cuts so words at the boundary are heard twice.
+    """
+    cuts = []
+    position = 0.0
+    while duration - position > target * (1 + window):
+        ideal = position + target
+        middles = [(start + end) / 2 for start, end in silences]
+        candidates = [m for m in middles if abs(m - ideal) <= target * window]
+        cut = min(candidates, key=lambda m: abs(m - ideal)) if candidates else ideal
+        cuts.append(cut)
+        position = cut
+    bounds = [0.0, *cuts, duration]
+    return [
+        (max(start - overlap, 0.0), min(end + overlap, duration))
+        for start, end in zip(bounds, bounds[1:])
+    ]
+
+
+def max_segment_seconds(
+    overlap: float = OVERLAP_SECONDS, window: float = SEARCH_WINDOW
+) -> float:
+    """Longest ``target`` whose segments still fit in one upload once encoded."""
+    return (MAX_UPLOAD_BYTES / SEGMENT_BYTES_PER_SECOND - 2 * overlap) / (1 + window)
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"\W", "", word.lower())
+
+
+def _boundary_match(previous: List[str], words: List[str], reach: int):
+    """The longest shared run of 2+ words that sits on the segment boundary.
+
+    The words the previous segment heard after the run and the next one
+    heard before it were all spoken inside the overlap, so together they
+    may not exceed ``reach``; a run further in is a phrase said twice.
+    """
+    blocks = difflib.SequenceMatcher(
+        None,
+        [_normalize(word) for word in previous],
+        [_normalize(word) for word in words],
+        autojunk=False,
+    ).get_matching_blocks()
+    anchored = [
+        block
+        for block in blocks
+        if block.size >= 2 and len(previous) - block.a - block.size + block.b <= reach
+    ]
+    return max(anchored, key=lambda block: block.size, default=None)
+
+
+def stitch(
+    segments: Sequence[Segment],
+    window: int = STITCH_WINDOW,
+    overlap: float = OVERLAP_SECONDS,
+) -> StitchedTranscript:
+    """Join segment transcripts, dropping the words repeated in each overlap.
+
+    The longest run of words shared across a boundary is kept once;
+    anything the previous segment heard after that run (a word cut off at
+    the boundary) is replaced by the next one. Without such a run, usually
+    because the overlap fell in a silence, both sides are kept unchanged.
+    """
+    reach = round(overlap * WORDS_PER_SECOND)
+    kept: List[List[str]] = []
+    for segment in segments:
+        words = segment.text.split()
+        previous = [word for part in kept for word in part][-window:]
+        if previous and words:
+            match = _boundary_match(previous, words[:window], reach)
+            if match is not None:
+                _drop_last(kept, len(previous) - match.a - match.size)
+                words = words[match.b + match.size :]
+        kept.append(words)
+    merged = [
+        Segment(segment.start, segment.end, " ".join(words))
+        for segment, words in zip(segments, kept)
+    ]
+    return StitchedTranscript(
+        " ".join(part.text for part in merged if part.text), merged
+    )
+
+
+def _drop_last(parts: List[List[str]], count: int) -> None:
+    for part in reversed(parts):
+        if count <= 0:
+            break
+        removed = min(count, len(part))
+        del part[len(part) - removed :]
+        count -= removed
+
+
+def transcribe_chunked(
+    name: str,
+    source,
+    *options,
+    target: float = SEGMENT_SECONDS,
+    overlap: float = OVERLAP_SECONDS,
+    max_workers: int = MAX_WORKERS,
+) -> StitchedTranscript:
+    """Transcribe a long recording as overlapping segments cut at silences.
+
+    The audio is decoded once to PCM, which spills to disk, while frame
+    loudness is measured; segments are then encoded with Opus and sent to
+    the provider concurrently before being stitched back together. A
+    ``target`` too long for one upload is shortened. The stitched result is
+    cached by audio content, provider, options, target and overlap.
+    """
+    limit = max_segment_seconds(overlap)
+    if target > limit:
+        print(
+            f"- Segments of {target:.0f} s are too large to upload, using {limit:.0f} s"
+        )
+        target = limit
+    frame_bytes = int(SAMPLE_RATE * FRAME_SECONDS) * SAMPLE_WIDTH
+    with open_audio(source) as audio, tempfile.SpooledTemporaryFile(
+        max_size=SPOOL_MAX_SIZE
+    ) as pcm:
+        key = stitched_key(audio_digest(audio), name, options, target, overlap)
+        hit = transcript_cache.get(key)
+        if hit is not None:
+            cached = json.loads(hit)
+            return StitchedTranscript(
+                cached["text"], [Segment(**segment) for segment in cached["segments"]]
+            )
+        levels = []
+        remainder = b""
+        for chunk in decode_pcm(audio):
+            pcm.write(chunk)
+            data = remainder + chunk
+            usable = len(data) - len(data) % frame_bytes
+            levels.append(frame_levels(np.frombuffer(data[:usable], dtype="<i2")))
+            remainder = data[usable:]
+        duration = pcm.tell() / (SAMPLE_RATE * SAMPLE_WIDTH)
+        silences = find_silences(np.concatenate(levels)) if levels else []
+        bounds = plan_segments(duration, silences, target, overlap)
+        if len(bounds) == 1 and audio.seek(0, os.SEEK_END) <= MAX_UPLOAD_BYTES:
+            # Cached by transcribe itself
+            text = transcribe(name, audio, *options)
+            return StitchedTranscript(text, [Segment(0.0, duration, text)])
+
+        lock = threading.Lock()
+
+        def run(index: int) -> str:
+            start, end = bounds[index]
+            with lock:
+                pcm.seek(int(start * SAMPLE_RATE) * SAMPLE_WIDTH)
+                data = pcm.read(int((end - start) * SAMPLE_RATE) * SAMPLE_WIDTH)
+            segment = encode(
+                wav_file(data, "segment.wav"), f"segment-{index:03d}", SEGMENT_CODEC
+            )
+            segment.duration = end - start
+            print(f"- Transcribing segment {index + 1}/{len(bounds)} with {name}...")
+            return transcribe(name, segment, *options)
+
+        with ThreadPoolExecutor(max_workers, thread_name_prefix="segment") as pool:
+            texts = list(pool.map(run, range(len(bounds))))
+    stitched = stitch(
+        [Segment(start, end, text) for (start, end), text in zip(bounds, texts)],
+        overlap=overlap,
+    )
+    transcript_cache.set(key, json.dumps(asdict(stitched)))
+    return stitched
@@ -0,0 +1,108 @@
+import threading
+from typing import Any, Callable, Dict
+
+from config import get_secret, get_setting
+
+# Each vendor SDK is imported and its client built the first time it is
+# used, so a session that only calls Whisper never loads the other five.
+# ``<NAME>_BASE_URL`` points a client at a proxy or a local stand-in.
+
+
+def _base_url(name: str):
+    return get_setting(f"{name.upper()}_BASE_URL") or None
+
+
+def _gemini():
+    import google.generativeai as genai
+
+    base_url = _base_url("gemini")
+    if base_url:
+        genai.configure(
+            api_key=get_secret("GEMINI_API_KEY"),
+            transport="rest",
+            client_options={"api_endpoint": base_url},
+        )
+    else:
+        genai.configure(api_key=get_secret("GEMINI_API_KEY"))
+    return genai
+
+
+def _together():
+    from together import Together
+
+    return Together(api_key=get_secret("TG_API_TOKEN"), base_url=_base_url("together"))
+
+
+def _openai():
+    from openai import OpenAI
+
+    return OpenAI(api_key=get_secret("OPENAI_API_KEY"), base_url=_base_url("openai"))
+
+
+def _groq():
+    from groq import Groq
+
+    return Groq(api_key=get_secret("GROQ"), base_url=_base_url("groq"))
+
+
+def _deepgram():
+    from deepgram import DeepgramClient, DeepgramClientOptions
+
+    return DeepgramClient(
+        get_secret("secret"), DeepgramClientOptions(url=_base_url("deepgram") or "")
+    )
+
+
+def _assemblyai():
+    import assemblyai as aai
+
+    aai.settings.api_key = get_secret("ASSEMBLY_API_KEY")
+    base_url = _base_url("assemblyai")
+    if base_url:
+        aai.settings.base_url = base_url
+    return aai
+
+
+FACTORIES: Dict[str, Callable[[], Any]] = {
+    "gemini": _gemini,
+    "together": _together,
+    "openai": _openai,
+    "groq": _groq,
+    "deepgram": _deepgram,
+    "assemblyai": _assemblyai,
+}
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str) -> Any:
+    """The process-wide client for vendor ``name``, built on first use.
+
+    ``gemini`` and ``assemblyai`` return their configured SDK module, the
+    others a client instance.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = FACTORIES[name]()
+    return client
+
+
+def gemini_model(model_name: str = "models/gemini-1.5-flash"):
+    """A Gemini ``GenerativeModel``, cached per model name."""
+    key = f"gemini:{model_name}"
+    model = _clients.get(key)
+    if model is None:
+        genai = get_client("gemini")
+        with _clients_lock:
+            model = _clients.setdefault(key, genai.GenerativeModel(model_name))
+    return model
+
+
+def reset_clients() -> None:
+    """Forget every client, e.g. after API keys or base URLs change."""
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,25 @@
+import os
+
+import streamlit as st
+
+
+def get_setting(name: str, default=None):
+    """Read a setting from the environment, falling back to Streamlit secrets.
+
+    ``st.secrets`` is only read when a secrets.toml exists: without one,
+    Streamlit reports the missing file (an error box in the app, warnings
+    in a script) on every lookup.
+    """
+    if name in os.environ:
+        return os.environ[name]
+    if not st.secrets.load_if_toml_exists():
+        return default
+    return st.secrets.get(name, default)
+
+
+def get_secret(name: str) -> str:
+    """Read a required setting such as an API key; raises KeyError if it is unset."""
+    value = get_setting(name)
+    if value is None:
+        raise KeyError(f"Missing setting {name!r} (environment or secrets.toml)")
+    return value
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fetch import AudioView, Cancelled, open_audio
+from transcribers import PROVIDERS
+
+MAX_WORKERS = 8
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="transcribe")
+
+
+@dataclass
+class TranscriptResult:
+    """Outcome of one provider's transcription, with its wall-clock latency."""
+
+    provider: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def transcribe(name: str, source, *options) -> str:
+    """Transcribe ``source`` with a single registered provider."""
+    provider = PROVIDERS[name]
+    return provider.transcribe(source, *(options or provider.defaults))
+
+
+def _run(name: str, audio, options: Tuple) -> TranscriptResult:
+    start = time.perf_counter()
+    try:
+        text = transcribe(name, audio, *options)
+    except Cancelled:
+        return TranscriptResult(
+            name, error="cancelled", seconds=time.perf_counter() - start
+        )
+    except Exception as e:
+        print(f"{name} transcription failed: {e}")
+        return TranscriptResult(name, error=str(e), seconds=time.perf_counter() - start)
+    return TranscriptResult(name, text=text, seconds=time.perf_counter() - start)
+
+
+def _submit(audio, names: Iterable[str], options: Dict[str, Tuple], cancel=None):
+    lock = threading.Lock()
+    return {
+        _executor.submit(
+            _run, name, AudioView(audio, lock, cancel), tuple(options.get(name, ()))
+        ): name
+        for name in names
+    }
+
+
+def fan_out(
+    source, names: Iterable[str], options: Optional[Dict[str, Tuple]] = None
+) -> List[TranscriptResult]:
+    """Send one recording to several providers at once and wait for all of them.
+
+    Results come back fastest first; failed providers carry their error.
+    """
+    with open_audio(source) as audio:
+        futures = _submit(audio, names, options or {})
+        results = [future.result() for future in futures]
+    return sorted(results, key=lambda result: (not result.ok, result.seconds))
+
+
+def race(
+    source, names: Iterable[str], options: Optional[Dict[str, Tuple]] = None
+) -> TranscriptResult:
+    """Return the first successful transcript and cancel the other providers.
+
+    Providers that have not started are dropped, uploads still in flight
+    abort on their next read, and jobs already submitted stop polling (see
+    ``fetch.cancel_event``). If every provider fails the last failure is
+    returned.
+    """
+    cancel = threading.Event()
+    with open_audio(source) as audio:
+        futures = _submit(audio, names, options or {}, cancel)
+        pending = set(futures)
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result.ok:
+                    break
+            if result is not None and result.ok:
+                break
+        cancel.set()
+        for future in pending:
+            future.cancel()
+    return result
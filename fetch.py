@@ -0,0 +1,245 @@
+import hashlib
+import io
+import mimetypes
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+from http_client import request
+from metrics import inc, timed
+
+CHUNK_SIZE = 1024 * 1024
+# Recordings larger than this spill from memory to a temp file on disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+DEFAULT_AUDIO_NAME = "audio.webm"
+# Audio types ``mimetypes`` has no extension for
+CONTENT_TYPE_EXTENSIONS = {
+    "audio/webm": ".webm",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/x-m4a": ".m4a",
+}
+
+
+class SpooledAudio(tempfile.SpooledTemporaryFile):
+    """Seekable, bounded-memory copy of a remote recording."""
+
+    def __init__(self, name: str, max_size: int = SPOOL_MAX_SIZE):
+        super().__init__(max_size=max_size)
+        self._audio_name = name
+        self.sha256 = None
+        # Size of the recording this copy was derived from, if it was shrunk
+        self.original_size = None
+        # Decoded length in seconds, when known, for pricing the transcription
+        self.duration = None
+
+    @property
+    def name(self) -> str:
+        return self._audio_name
+
+
+def audio_name(url: str, content_type: Optional[str] = None) -> str:
+    """File name for a linked recording, from its URL path or Content-Type.
+
+    The extension tells ffmpeg and the vendors which container to expect.
+    """
+    name = os.path.basename(unquote(urlsplit(url).path))
+    if os.path.splitext(name)[1]:
+        return name
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    extension = None
+    if mimetype.startswith(("audio/", "video/")):
+        extension = CONTENT_TYPE_EXTENSIONS.get(mimetype) or mimetypes.guess_extension(
+            mimetype
+        )
+    if not extension:
+        return DEFAULT_AUDIO_NAME
+    return os.path.splitext(name or DEFAULT_AUDIO_NAME)[0] + extension
+
+
+def fetch_audio(url: str, name: Optional[str] = None) -> SpooledAudio:
+    """Stream a remote recording chunk by chunk into a spooled temp file.
+
+    Without a ``name``, one is taken from the URL or the response's
+    Content-Type. The SHA-256 of the body is computed on the way through
+    and kept on the returned file as ``sha256``.
+    """
+    sha = hashlib.sha256()
+    host = urlsplit(url).hostname or ""
+    audio = None
+    try:
+        with timed("download"), request("GET", url, stream=True) as response:
+            response.raise_for_status()
+            audio = SpooledAudio(
+                name or audio_name(url, response.headers.get("Content-Type"))
+            )
+            for chunk in response.iter_content(CHUNK_SIZE):
+                sha.update(chunk)
+                audio.write(chunk)
+                inc("bytes_total", len(chunk), direction="download", provider=host)
+    except BaseException:
+        if audio is not None:
+            audio.close()
+        raise
+    audio.sha256 = sha.hexdigest()
+    audio.seek(0)
+    return audio
+
+
+def audio_mimetype(audio, default: str = "audio/webm") -> str:
+    """MIME type guessed from a recording's file name."""
+    return mimetypes.guess_type(audio.name)[0] or default
+
+
+@contextmanager
+def open_audio(source, name: Optional[str] = None):
+    """Yield a readable file for an uploaded file or a link to a recording."""
+    if isinstance(source, str):
+        with fetch_audio(source, name) as audio:
+            yield audio
+    else:
+        source.seek(0)
+        yield source
+
+
+class Cancelled(Exception):
+    """Raised from a read once the consumer of an AudioView was cancelled."""
+
+
+class AudioView(io.RawIOBase):
+    """Independent reader over a recording shared between threads.
+
+    Each view keeps its own position and reads the shared file under a
+    lock, so several providers can upload the same recording at once.
+    Setting ``cancel`` aborts the view's next read; providers also stop
+    polling and skip job submission once it is set (see ``cancel_event``).
+    """
+
+    def __init__(self, audio, lock: threading.Lock, cancel: threading.Event = None):
+        super().__init__()
+        self._audio = audio
+        self._lock = lock
+        self.cancel = cancel
+        self._position = 0
+        self.name = audio.name
+        self.sha256 = getattr(audio, "sha256", None)
+        self.duration = getattr(audio, "duration", None)
+        with lock:
+            self._size = audio.seek(0, os.SEEK_END)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.cancel is not None and self.cancel.is_set():
+            raise Cancelled(self.name)
+        with self._lock:
+            self._audio.seek(self._position)
+            data = self._audio.read(len(buffer))
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def cancel_event(audio) -> Optional[threading.Event]:
+    """The event that cancels work on ``audio``, if it is a cancellable view."""
+    return getattr(audio, "cancel", None)
+
+
+def check_cancelled(cancel: Optional[threading.Event], what: str) -> None:
+    if cancel is not None and cancel.is_set():
+        raise Cancelled(what)
+
+
+class MultipartUpload:
+    """multipart/form-data body that streams a single file part in chunks.
+
+    ``requests`` reads the whole file into memory when given ``files=``;
+    passing this object as ``data=`` sends it with a Content-Length header
+    while only holding one chunk at a time.
+    """
+
+    def __init__(self, field: str, fileobj, filename: str, content_type: str):
+        self.boundary = uuid.uuid4().hex
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._file = fileobj
+        start = fileobj.tell()
+        size = fileobj.seek(0, os.SEEK_END) - start
+        fileobj.seek(start)
+        self.len = len(self._head) + size + len(self._tail)
+        self._current = b""
+        self._offset = 0
+        self._chunks = self._iter_chunks()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _iter_chunks(self):
+        yield self._head
+        while True:
+            chunk = self._file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        yield self._tail
+
+    def __iter__(self):
+        return iter(lambda: self.read(CHUNK_SIZE), b"")
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        while size != 0:
+            if self._offset >= len(self._current):
+                self._current = next(self._chunks, None)
+                self._offset = 0
+                if self._current is None:
+                    self._current = b""
+                    break
+            end = len(self._current) if size < 0 else self._offset + size
+            piece = self._current[self._offset : end]
+            self._offset += len(piece)
+            if size > 0:
+                size -= len(piece)
+            parts.append(piece)
+        return b"".join(parts)
+
+
+def upload_file(
+    url: str, headers: dict, field: str, fileobj, filename: str, content_type: str
+) -> dict:
+    """POST a file as multipart/form-data without buffering it in memory."""
+    body = MultipartUpload(field, fileobj, filename, content_type)
+    host = urlsplit(url).hostname
+    inc("bytes_total", body.len, direction="upload", provider=host)
+    with timed("upload", host):
+        response = request(
+            "POST",
+            url,
+            headers={**headers, "Content-Type": body.content_type},
+            data=body,
+        )
+    return response.json()
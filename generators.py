@@ -0,0 +1,115 @@
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from cache import completion_cache, completion_key
+from clients import gemini_model, get_client
+from metrics import record_completion, timed
+from ratelimit import get_limiter
+from templates import DEFAULT_POLICY, estimate_tokens, render_prompt
+
+# A rendered prompt, or a conversation of {"role", "content"} messages
+Prompt = Union[str, List[Dict]]
+
+
+def stream_gemini(text: Prompt) -> Iterator[str]:
+    if not isinstance(text, str):
+        text = [
+            {
+                "role": "model" if message["role"] == "assistant" else "user",
+                "parts": [message["content"]],
+            }
+            for message in text
+        ]
+    response = gemini_model().generate_content(text, stream=True)
+    for chunk in response:
+        try:
+            part = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. a final safety-rating chunk)
+            continue
+        yield part
+
+
+def stream_together(text: Prompt) -> Iterator[str]:
+    client = get_client("together")
+    response = client.chat.completions.create(
+        model="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
+        messages=[{"role": "user", "content": text}] if isinstance(text, str) else text,
+        stream=True,
+    )
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+GENERATORS: Dict[str, Callable[[Prompt], Iterator[str]]] = {
+    "TogetherAI": stream_together,
+    "Gemini": stream_gemini,
+}
+
+
+def stream_text(name: str, text: str, tag: Optional[str] = None) -> Iterator[str]:
+    """Stream the completion of a rendered prompt, storing the full text once done.
+
+    Completions live in the on-disk ``completion_cache``, shared by every
+    worker and kept across restarts; one seen before is replayed as a
+    single chunk. ``tag`` names the library prompt it came from so editing
+    that prompt drops it. An interrupted stream is not stored. New
+    completions wait their turn in the provider's rate limiter.
+    """
+    key = completion_key(name, text)
+    cached = completion_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    with get_limiter(name).slot(), timed("generate", name):
+        for part in GENERATORS[name](text):
+            parts.append(part)
+            yield part
+    completion = "".join(parts)
+    record_completion(name, estimate_tokens(text), estimate_tokens(completion))
+    completion_cache.set(key, completion, tag)
+
+
+def stream_chat(name: str, messages: List[Dict]) -> Iterator[str]:
+    """Stream a reply to a conversation; chat turns are not cached."""
+    parts = []
+    with get_limiter(name).slot(), timed("chat", name):
+        for part in GENERATORS[name](messages):
+            parts.append(part)
+            yield part
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    record_completion(name, prompt_tokens, estimate_tokens("".join(parts)))
+
+
+def is_cached(name: str, text: str) -> bool:
+    """Whether the completion of a rendered prompt is already stored."""
+    return completion_cache.contains(completion_key(name, text))
+
+
+def complete(name: str, text: str, tag: Optional[str] = None) -> str:
+    return "".join(stream_text(name, text, tag))
+
+
+def stream_completion(
+    name: str, transcript: str, prompt: Dict, policy: str = DEFAULT_POLICY
+) -> Iterator[str]:
+    """Render ``prompt`` for the transcript within the model's budget and stream it."""
+    tag = prompt.get("name")
+    text = render_prompt(
+        prompt, transcript, name, policy, lambda part: complete(name, part, tag)
+    )
+    yield from stream_text(name, text, tag)
+
+
+def Gemini(transcript: str, prompt: Dict) -> str:
+    return "".join(stream_completion("Gemini", transcript, prompt))
+
+
+def TogetherAI(transcript: str, prompt: Dict) -> str:
+    return "".join(stream_completion("TogetherAI", transcript, prompt))
+
+
+def ScoringGemini(prd: str, prompt: Dict) -> str:
+    """Score a PRD with Gemini using the library's "Scoring" prompt."""
+    return Gemini(prd, prompt)
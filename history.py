@@ -0,0 +1,122 @@
+import hashlib
+from typing import Dict, List, Optional
+
+from config import get_setting
+from templates import CHARS_PER_TOKEN, estimate_tokens, truncate
+
+MAX_MESSAGES = int(get_setting("HISTORY_MAX_MESSAGES", 50))
+MAX_CHARS = int(get_setting("HISTORY_MAX_CHARS", 200_000))
+# Room kept for the digest of messages evicted from the history
+SUMMARY_TOKENS = 1_000
+# Characters of each evicted message kept in that digest
+EXCERPT_CHARS = 300
+CHAT_CONTEXT_TOKENS = int(get_setting("CHAT_CONTEXT_TOKENS", 32_000))
+
+
+def content_key(kind: str, content: str) -> str:
+    return f"{kind}:" + hashlib.sha256(content.encode()).hexdigest()
+
+
+class ChatHistory:
+    """A session's messages, bounded in count and size and free of duplicates.
+
+    Streamlit re-runs the page on every interaction, so the transcript, PRD
+    and scores would otherwise be appended again each time; messages added
+    with a ``key`` already seen are skipped. Recordings are kept as a short
+    reference (name, size, id or hash), never as the file itself. Once the
+    history holds more than ``max_messages`` or ``max_chars``, the oldest
+    messages are evicted and an excerpt of each is folded into ``summary``.
+    """
+
+    def __init__(self, max_messages: int = MAX_MESSAGES, max_chars: int = MAX_CHARS):
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self.messages: List[Dict] = []
+        self.summary = ""
+        self._keys = set()
+        self._chars = 0
+
+    def add(
+        self, role: str, content: str, kind: str = "chat", key: Optional[str] = None
+    ) -> bool:
+        """Append a message; returns False if ``key`` was already added."""
+        if key is not None:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+        self.messages.append(
+            {
+                "role": role,
+                "content": content,
+                "kind": kind,
+                "key": key,
+                "tokens": estimate_tokens(content),
+            }
+        )
+        self._chars += len(content)
+        self._evict()
+        return True
+
+    def add_recording(self, source) -> bool:
+        """Record which recording was used, without keeping its audio."""
+        if isinstance(source, str):
+            return self.add("user", f"Recording link: {source}", "recording", source)
+        name = getattr(source, "name", "recording")
+        size = getattr(source, "size", None)
+        identity = (
+            getattr(source, "file_id", None)
+            or getattr(source, "sha256", None)
+            or f"{name}:{size}"
+        )
+        label = f"Uploaded recording: {name}"
+        if size:
+            label += f" ({size / 1e6:.1f} MB)"
+        return self.add("user", label, "recording", f"recording:{identity}")
+
+    def _evict(self) -> None:
+        excerpts = []
+        while len(self.messages) > 1 and (
+            len(self.messages) > self.max_messages or self._chars > self.max_chars
+        ):
+            message = self.messages.pop(0)
+            self._chars -= len(message["content"])
+            excerpt = message["content"][:EXCERPT_CHARS].replace("\n", " ")
+            excerpts.append(f"- {message['role']} ({message['kind']}): {excerpt}")
+        if excerpts:
+            digest = "\n".join(filter(None, [self.summary, *excerpts]))
+            # Keep the newest excerpts when the digest itself grows too large
+            self.summary = digest[-SUMMARY_TOKENS * CHARS_PER_TOKEN :]
+
+    def clear(self) -> None:
+        self.messages.clear()
+        self.summary = ""
+        self._keys.clear()
+        self._chars = 0
+
+    def context(self, budget: int = CHAT_CONTEXT_TOKENS) -> List[Dict]:
+        """The newest messages that fit in ``budget`` tokens, oldest first.
+
+        Token counts are stored with each message, so this walks back from
+        the newest message only as far as the budget allows. A message that
+        only partly fits is truncated; the digest of evicted messages leads
+        if there is room left for it.
+        """
+        selected = []
+        remaining = budget
+        for message in reversed(self.messages):
+            if remaining <= 0:
+                break
+            content = message["content"]
+            if message["tokens"] > remaining:
+                content = truncate(content, remaining)
+            selected.append({"role": message["role"], "content": content})
+            remaining -= min(message["tokens"], remaining)
+        if self.summary and remaining > estimate_tokens(self.summary):
+            selected.append(
+                {
+                    "role": "user",
+                    "content": "Earlier in this session:\n" + self.summary,
+                }
+            )
+        selected.reverse()
+        return selected
@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# (connect, read) timeouts in seconds, looked up by host
+DEFAULT_TIMEOUT = (5, 60)
+TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "api.gladia.io": (5, 30),
+}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_latency: Dict[str, Dict[str, float]] = {}
+_latency_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def timeout_for(url: str) -> Tuple[float, float]:
+    """Connect/read timeout configured for the host of ``url``."""
+    return TIMEOUTS.get(urlsplit(url).hostname or "", DEFAULT_TIMEOUT)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def _record(host: str, elapsed: float, retried: bool) -> None:
+    with _latency_lock:
+        entry = _latency.setdefault(
+            host, {"requests": 0, "retries": 0, "seconds": 0.0, "max_seconds": 0.0}
+        )
+        entry["requests"] += 1
+        entry["retries"] += int(retried)
+        entry["seconds"] += elapsed
+        entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+
+def request(method: str, url: str, retries: Optional[int] = None, **kwargs):
+    """Send a request through the pooled session.
+
+    Idempotent methods are retried on connection errors, timeouts and
+    429/5xx responses with exponential backoff and jitter.
+    """
+    method = method.upper()
+    kwargs.setdefault("timeout", timeout_for(url))
+    if retries is None:
+        retries = MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+    host = urlsplit(url).hostname or ""
+    session = get_session()
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(host, time.perf_counter() - start, attempt < retries)
+            metrics.observe(
+                "http_request_seconds",
+                time.perf_counter() - start,
+                host=host,
+                method=method,
+                status="error",
+            )
+            if attempt >= retries:
+                raise
+        else:
+            retry = attempt < retries and response.status_code in RETRY_STATUSES
+            _record(host, time.perf_counter() - start, retry)
+            metrics.observe(
+                "http_request_seconds",
+                time.perf_counter() - start,
+                host=host,
+                method=method,
+                status=response.status_code,
+            )
+            if not retry:
+                # Streamed bodies are counted by their reader as chunks arrive
+                if method != "HEAD" and not kwargs.get("stream"):
+                    metrics.inc(
+                        "bytes_total",
+                        len(response.content),
+                        direction="download",
+                        provider=host,
+                    )
+                return response
+            response.close()
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+
+
+def stats() -> Dict[str, Dict]:
+    """Connection pool hits and per-host latency counters."""
+    pools = {}
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools[key]
+                pools[f"{pool.scheme}://{pool.host}"] = {
+                    "requests": pool.num_requests,
+                    "connections": pool.num_connections,
+                    "pool_hits": pool.num_requests - pool.num_connections,
+                }
+    with _latency_lock:
+        latency = {host: dict(entry) for host, entry in _latency.items()}
+    return {"pools": pools, "latency": latency}
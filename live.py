@@ -0,0 +1,300 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from audio import SAMPLE_RATE, SAMPLE_WIDTH, decode_pcm
+from config import get_secret, get_setting
+from generators import complete, stream_completion
+from http_client import request
+from mapreduce import DEFAULT_MAP_PROMPT
+from metrics import record_transcription, timed
+from ratelimit import get_limiter
+from templates import compile_template
+from transcribers import GLADIA_API_URL
+
+FRAME_MS = int(get_setting("LIVE_FRAME_MS", 250))
+# Seconds of new finalized speech before the PRD draft is brought up to date
+DRAFT_INTERVAL = float(get_setting("LIVE_DRAFT_INTERVAL", 30))
+PCM_BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+
+
+def audio_frames(
+    audio, frame_ms: int = FRAME_MS, realtime: bool = True, speed: float = 1.0
+) -> Iterator[bytes]:
+    """Decode a recording to 16 kHz mono PCM and yield it in ``frame_ms`` frames.
+
+    With ``realtime`` each frame is released when the meeting would have
+    reached it (``speed`` times faster), so a finished file behaves like a
+    microphone whatever its container or bitrate.
+    """
+    size = PCM_BYTES_PER_SECOND * frame_ms // 1000
+    rate = PCM_BYTES_PER_SECOND * speed
+    buffer = bytearray()
+    start = time.monotonic()
+    sent = 0
+
+    def release(frame: bytes) -> bytes:
+        nonlocal sent
+        if realtime:
+            delay = start + sent / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        sent += len(frame)
+        return frame
+
+    for chunk in decode_pcm(audio):
+        buffer += chunk
+        while len(buffer) >= size:
+            yield release(bytes(buffer[:size]))
+            del buffer[:size]
+    if buffer:
+        yield release(bytes(buffer))
+
+
+@dataclass
+class LiveSegment:
+    """One transcript message: interim text is replaced, final text is kept."""
+
+    text: str
+    is_final: bool
+    start: float = 0.0
+    end: float = 0.0
+
+
+def _live_url(name: str, default: str) -> str:
+    return get_setting(f"{name.upper()}_LIVE_URL") or default
+
+
+def _deepgram_open(model: Optional[str]) -> Tuple[str, Dict]:
+    base_url = get_setting("DEEPGRAM_BASE_URL")
+    default = "wss://api.deepgram.com"
+    if base_url:
+        default = base_url.rstrip("/").replace("http", "ws", 1)
+    query = urlencode(
+        {
+            "model": model or "nova-2",
+            "encoding": "linear16",
+            "sample_rate": SAMPLE_RATE,
+            "channels": 1,
+            "interim_results": "true",
+            "punctuate": "true",
+        }
+    )
+    url = _live_url("deepgram", f"{default}/v1/listen")
+    return f"{url}?{query}", {"Authorization": f"Token {get_secret('secret')}"}
+
+
+def _deepgram_parse(message: Dict) -> Optional[LiveSegment]:
+    if message.get("type") != "Results":
+        return None
+    start = message.get("start", 0.0)
+    return LiveSegment(
+        message["channel"]["alternatives"][0]["transcript"],
+        message.get("is_final", False),
+        start,
+        start + message.get("duration", 0.0),
+    )
+
+
+def _assembly_open(model: Optional[str]) -> Tuple[str, Dict]:
+    query = urlencode(
+        {"sample_rate": SAMPLE_RATE, "encoding": "pcm_s16le", "format_turns": "true"}
+    )
+    url = _live_url("assemblyai", "wss://streaming.assemblyai.com/v3/ws")
+    return f"{url}?{query}", {"Authorization": get_secret("ASSEMBLY_API_KEY")}
+
+
+def _assembly_parse(message: Dict) -> Optional[LiveSegment]:
+    if message.get("type") != "Turn":
+        return None
+    words = message.get("words") or [{"start": 0, "end": 0}]
+    return LiveSegment(
+        message["transcript"],
+        # An ended turn is sent again once punctuated; keep that version
+        message.get("end_of_turn", False) and message.get("turn_is_formatted", False),
+        words[0]["start"] / 1000,
+        words[-1]["end"] / 1000,
+    )
+
+
+def _gladia_open(model: Optional[str]) -> Tuple[str, Dict]:
+    # A session is created over HTTP; its WebSocket URL carries the token
+    response = request(
+        "POST",
+        f"{GLADIA_API_URL}/v2/live",
+        headers={"x-gladia-key": get_secret("GLADIA_API_KEY")},
+        json={
+            "encoding": "wav/pcm",
+            "sample_rate": SAMPLE_RATE,
+            "bit_depth": SAMPLE_WIDTH * 8,
+            "channels": 1,
+            "messages_config": {"receive_partial_transcripts": True},
+        },
+    )
+    response.raise_for_status()
+    return response.json()["url"], {}
+
+
+def _gladia_parse(message: Dict) -> Optional[LiveSegment]:
+    if message.get("type") != "transcript":
+        return None
+    utterance = message["data"]["utterance"]
+    return LiveSegment(
+        utterance["text"].strip(),
+        message["data"].get("is_final", False),
+        utterance.get("start", 0.0),
+        utterance.get("end", 0.0),
+    )
+
+
+@dataclass(frozen=True)
+class LiveProvider:
+    """How to open, read and close one vendor's streaming session."""
+
+    open: Callable[[Optional[str]], Tuple[str, Dict]]
+    parse: Callable[[Dict], Optional[LiveSegment]]
+    close: Dict
+
+
+LIVE_PROVIDERS: Dict[str, LiveProvider] = {
+    "Deepgram": LiveProvider(_deepgram_open, _deepgram_parse, {"type": "CloseStream"}),
+    "Assembly": LiveProvider(_assembly_open, _assembly_parse, {"type": "Terminate"}),
+    "Gladia": LiveProvider(_gladia_open, _gladia_parse, {"type": "stop_recording"}),
+}
+
+
+class LiveTranscriber:
+    """Streaming transcription of PCM frames over a WebSocket.
+
+    Frames are sent from a worker thread while ``segments()`` yields the
+    interim and final results as they come back, so a page can show words
+    a moment after they are spoken. The stream holds one of the provider's
+    rate-limiter slots for as long as it is open.
+    """
+
+    def __init__(
+        self,
+        frames: Iterable[bytes],
+        name: str = "Deepgram",
+        model: Optional[str] = None,
+    ):
+        self.frames = frames
+        self.name = name
+        self.model = model
+        self.provider = LIVE_PROVIDERS[name]
+        self.bytes_sent = 0
+        self.final_text = ""
+        self._error: Optional[BaseException] = None
+
+    def _send(self, websocket) -> None:
+        try:
+            for frame in self.frames:
+                websocket.send(frame)
+                self.bytes_sent += len(frame)
+            # The vendor flushes the last results, then closes the socket
+            websocket.send(json.dumps(self.provider.close))
+        except Exception as e:
+            self._error = e
+            websocket.close()
+
+    def segments(self) -> Iterator[LiveSegment]:
+        from websockets.sync.client import connect
+
+        finals: List[str] = []
+        with get_limiter(self.name).slot(), timed("live", self.name):
+            url, headers = self.provider.open(self.model)
+            with connect(url, additional_headers=headers, max_size=None) as websocket:
+                sender = threading.Thread(
+                    target=self._send, args=(websocket,), daemon=True
+                )
+                sender.start()
+                for message in websocket:
+                    segment = self.provider.parse(json.loads(message))
+                    if segment is None:
+                        continue
+                    if segment.is_final and segment.text:
+                        finals.append(segment.text)
+                        self.final_text = " ".join(finals)
+                    yield segment
+                sender.join()
+        if self._error is not None:
+            raise self._error
+        record_transcription(
+            self.name, self.bytes_sent, self.bytes_sent / PCM_BYTES_PER_SECOND
+        )
+
+
+class RollingDraft:
+    """A PRD draft kept up to date while a meeting is still being transcribed.
+
+    Finalized speech is batched; every ``interval`` seconds of it, the
+    batch's requirements are extracted with the map prompt and the draft is
+    rebuilt from all extracts so far with the selected prompt, as the
+    map-reduce pipeline does. Updates run one at a time on a worker thread,
+    so only the last batch is left to process when the meeting ends.
+    """
+
+    def __init__(
+        self,
+        generator: str,
+        prompt: Dict,
+        map_prompt: Optional[Dict] = None,
+        interval: float = DRAFT_INTERVAL,
+    ):
+        self.generator = generator
+        self.prompt = prompt
+        self.map_prompt = map_prompt or DEFAULT_MAP_PROMPT
+        self.interval = interval
+        self.draft = ""
+        self.version = 0
+        self.extracts: List[str] = []
+        self._pending: List[str] = []
+        self._pending_since: Optional[float] = None
+        self._template = compile_template(self.map_prompt["content"])
+        self._updates = ThreadPoolExecutor(1, thread_name_prefix="draft")
+        self._futures: "queue.Queue" = queue.Queue()
+
+    def add(self, segment: LiveSegment) -> None:
+        """Queue a final segment; starts an update once enough speech is pending."""
+        if not (segment.is_final and segment.text):
+            return
+        if self._pending_since is None:
+            self._pending_since = segment.start
+        self._pending.append(segment.text)
+        if segment.end - self._pending_since >= self.interval:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        batch = " ".join(self._pending)
+        self._pending = []
+        self._pending_since = None
+        self._futures.put(self._updates.submit(self._update, batch))
+
+    def _update(self, batch: str) -> None:
+        with timed("live_draft", self.generator):
+            tag = self.map_prompt.get("name")
+            text = self._template.render(transcript=batch)
+            self.extracts.append(complete(self.generator, text, tag))
+            notes = "\n\n".join(
+                f"Part {index}:\n{extract}"
+                for index, extract in enumerate(self.extracts, 1)
+            )
+            draft = "".join(
+                stream_completion(self.generator, notes, self.prompt, "truncate")
+            )
+        self.draft = draft
+        self.version += 1
+
+    def finish(self) -> str:
+        """Process the remaining speech and return the final draft."""
+        self._flush()
+        while not self._futures.empty():
+            self._futures.get().result()
+        return self.draft
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from config import get_setting
+from generators import complete, is_cached, stream_completion
+from metrics import observe
+from templates import MAP_WORKERS, compile_template, estimate_tokens, split_text
+
+# Library prompt used for the map step, if the team has added one
+MAP_PROMPT_NAME = "Extract Requirements"
+DEFAULT_MAP_PROMPT = {
+    "name": MAP_PROMPT_NAME,
+    "content": (
+        "You are reading one part of a longer meeting transcript. List every "
+        "product requirement, feature, user role, constraint, metric, decision "
+        "and open question mentioned in this part as concise bullet points. "
+        "Do not add anything that is not said.\n\nTranscript part:\n{transcript}"
+    ),
+    "description": "Map step of map-reduce PRD generation",
+}
+CHUNK_TOKENS = int(get_setting("MAP_CHUNK_TOKENS", 8000))
+
+
+class MapReduce:
+    """PRD generation over a long transcript in two stages.
+
+    The transcript is split into chunks and requirements are extracted from
+    each chunk concurrently (map); the extracts are then turned into a PRD
+    with the selected library prompt (reduce). Map results are cached by
+    rendered prompt, so re-running with another reduce prompt only pays for
+    the reduce call.
+    """
+
+    def __init__(
+        self,
+        generator: str,
+        transcript: str,
+        reduce_prompt: Dict,
+        map_prompt: Optional[Dict] = None,
+        chunk_tokens: int = CHUNK_TOKENS,
+        workers: int = MAP_WORKERS,
+    ):
+        self.generator = generator
+        self.transcript = transcript
+        self.reduce_prompt = reduce_prompt
+        self.map_prompt = map_prompt or DEFAULT_MAP_PROMPT
+        self.chunk_tokens = chunk_tokens
+        self.workers = workers
+        self.chunks: List[str] = []
+        self.cached = 0
+        self.timings: Dict[str, float] = {}
+
+    def map(self) -> List[str]:
+        """Extract requirements from every chunk with a bounded worker pool."""
+        start = time.perf_counter()
+        self.chunks = split_text(self.transcript, self.chunk_tokens)
+        template = compile_template(self.map_prompt["content"])
+        texts = [template.render(transcript=chunk) for chunk in self.chunks]
+        self.cached = sum(is_cached(self.generator, text) for text in texts)
+        self.timings["split"] = time.perf_counter() - start
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="map") as pool:
+            extracts = list(
+                pool.map(
+                    lambda text: complete(
+                        self.generator, text, self.map_prompt.get("name")
+                    ),
+                    texts,
+                )
+            )
+        self.timings["map"] = time.perf_counter() - start
+        observe(
+            "stage_seconds",
+            self.timings["map"],
+            stage="map",
+            provider=self.generator,
+            status="ok",
+        )
+        return extracts
+
+    def stream(self) -> Iterator[str]:
+        """Run the map stage, then stream the reduce stage's PRD tokens.
+
+        A transcript that fits in one chunk skips the map stage.
+        """
+        if estimate_tokens(self.transcript) <= self.chunk_tokens:
+            start = time.perf_counter()
+            yield from stream_completion(
+                self.generator, self.transcript, self.reduce_prompt, "truncate"
+            )
+            self.timings["reduce"] = time.perf_counter() - start
+            return
+        extracts = self.map()
+        notes = "\n\n".join(
+            f"Part {index} of {len(extracts)}:\n{extract}"
+            for index, extract in enumerate(extracts, 1)
+        )
+        start = time.perf_counter()
+        yield from stream_completion(
+            self.generator, notes, self.reduce_prompt, "truncate"
+        )
+        self.timings["reduce"] = time.perf_counter() - start
@@ -0,0 +1,341 @@
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from config import get_setting
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Raw samples kept per series for the in-app percentiles
+RECENT_SAMPLES = 512
+# Used to guess a recording's length from its size when pricing a transcription
+# whose length is not known; by extension, with a default for the rest
+ASSUMED_AUDIO_BYTES_PER_SECOND = 16_000
+BYTES_PER_SECOND_BY_EXTENSION = {
+    ".wav": 32_000,  # 16 kHz, 16-bit, mono PCM
+    ".flac": 16_000,
+    ".ogg": 3_000,  # 24 kb/s Opus
+    ".opus": 3_000,
+}
+
+# List prices in USD; override with <PROVIDER>_COST_PER_MINUTE or
+# <MODEL>_COST_PER_MTOK_IN / _OUT
+COST_PER_AUDIO_MINUTE = {
+    "Assembly": 0.0062,
+    "Deepgram": 0.0043,
+    "Gladia": 0.0102,
+    "Groq": 0.000667,
+    "Whisper": 0.006,
+}
+COST_PER_MILLION_TOKENS = {  # (input, output)
+    "Gemini": (0.075, 0.30),
+    "TogetherAI": (0.27, 0.85),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram plus a window of recent samples."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent: "deque[float]" = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, q: float) -> float:
+        samples = sorted(self.recent)
+        if not samples:
+            return 0.0
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+_counters: Dict[Tuple[str, Labels], float] = {}
+_lock = threading.Lock()
+# Length of the audio a transcriber on this thread reported, if it did
+_audio_seconds = threading.local()
+
+
+def _labels(labels: Dict[str, Optional[str]]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Add one latency sample to histogram ``name``."""
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Add ``amount`` to counter ``name``."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timed(stage: str, provider: Optional[str] = None):
+    """Record how long the block takes as a ``stage`` sample, failed or not."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        observe(
+            "stage_seconds",
+            time.perf_counter() - start,
+            stage=stage,
+            provider=provider,
+            status=status,
+        )
+
+
+def instrument(stage: str, provider: Optional[str] = None):
+    """Decorator form of ``timed``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage, provider):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def cost_per_minute(provider: str) -> float:
+    default = COST_PER_AUDIO_MINUTE.get(provider, 0.0)
+    return float(get_setting(f"{provider.upper()}_COST_PER_MINUTE", default))
+
+
+def record_transcription(
+    provider: str, audio_bytes: int, seconds: Optional[float] = None
+) -> None:
+    """Count the audio sent to a transcriber and its estimated cost.
+
+    Without ``seconds`` the length is guessed from the encoded size.
+    """
+    inc("audio_bytes_total", audio_bytes, provider=provider)
+    if seconds is None:
+        seconds = audio_bytes / ASSUMED_AUDIO_BYTES_PER_SECOND
+    inc("cost_usd_total", seconds / 60 * cost_per_minute(provider), provider=provider)
+
+
+def record_completion(model: str, input_tokens: int, output_tokens: int) -> None:
+    """Count an LLM call's tokens and its estimated cost."""
+    default_in, default_out = COST_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    price_in = float(get_setting(f"{model.upper()}_COST_PER_MTOK_IN", default_in))
+    price_out = float(get_setting(f"{model.upper()}_COST_PER_MTOK_OUT", default_out))
+    inc("tokens_total", input_tokens, direction="input", provider=model)
+    inc("tokens_total", output_tokens, direction="output", provider=model)
+    cost = (input_tokens * price_in + output_tokens * price_out) / 1e6
+    inc("cost_usd_total", cost, provider=model)
+
+
+def report_audio_seconds(seconds: float) -> None:
+    """Give the transcriber running on this thread the length of its audio.
+
+    For providers that report the length of what they received, so the
+    cost is not guessed from the encoded size.
+    """
+    _audio_seconds.value = seconds
+
+
+def _guess_seconds(audio, size: int) -> float:
+    extension = os.path.splitext(getattr(audio, "name", "") or "")[1].lower()
+    rate = BYTES_PER_SECOND_BY_EXTENSION.get(extension, ASSUMED_AUDIO_BYTES_PER_SECOND)
+    return size / rate
+
+
+def instrument_transcriber(provider: str):
+    """Time a transcriber and count the bytes and estimated cost of its audio.
+
+    The length used for the cost is, in order of preference: what the
+    transcriber reported with ``report_audio_seconds``, the ``duration``
+    attribute of the audio file, or a guess from its size and extension.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(audio, *options):
+            position = audio.tell()
+            size = audio.seek(0, 2)
+            audio.seek(position)
+            previous = getattr(_audio_seconds, "value", None)
+            _audio_seconds.value = None
+            try:
+                with timed("transcribe", provider):
+                    text = func(audio, *options)
+                seconds = _audio_seconds.value
+            finally:
+                _audio_seconds.value = previous
+            if seconds is None:
+                seconds = getattr(audio, "duration", None)
+            if seconds is None:
+                seconds = _guess_seconds(audio, size)
+            record_transcription(provider, size, seconds)
+            return text
+
+        return wrapper
+
+    return decorator
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def render_prometheus(prefix: str = "prd_") -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {
+            key: (list(h.counts), h.total, h.count) for key, h in _histograms.items()
+        }
+        counters = dict(_counters)
+    lines: List[str] = []
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        for (series, labels), (counts, total, count) in sorted(histograms.items()):
+            if series != name:
+                continue
+            cumulative = 0
+            for bound, bucket in zip([*BUCKETS, "+Inf"], counts):
+                cumulative += bucket
+                le = (("le", str(bound)),)
+                lines.append(
+                    f"{prefix}{name}_bucket{_format_labels(labels, le)} {cumulative}"
+                )
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {count}")
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {prefix}{name} counter")
+        for (series, labels), value in sorted(counters.items()):
+            if series == name:
+                lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> List[Dict]:
+    """One row per stage and provider for the in-app timing panel."""
+    with _lock:
+        rows = []
+        for (name, labels), histogram in sorted(_histograms.items()):
+            if name != "stage_seconds":
+                continue
+            label = dict(labels)
+            rows.append(
+                {
+                    "Stage": label.get("stage", ""),
+                    "Provider": label.get("provider", ""),
+                    "Status": label.get("status", ""),
+                    "Calls": histogram.count,
+                    "Mean (s)": round(histogram.total / histogram.count, 3),
+                    "p50 (s)": round(histogram.percentile(0.5), 3),
+                    "p95 (s)": round(histogram.percentile(0.95), 3),
+                    "Max (s)": round(max(histogram.recent), 3),
+                }
+            )
+    return sorted(rows, key=lambda row: (row["Stage"], row["Provider"]))
+
+
+def usage() -> List[Dict]:
+    """Bytes, tokens and estimated cost per provider, and cache hit counts."""
+    with _lock:
+        counters = dict(_counters)
+    rows: Dict[str, Dict] = {}
+    for (name, labels), value in sorted(counters.items()):
+        label = dict(labels)
+        if name == "cache_requests_total":
+            row = rows.setdefault(f"cache:{label['cache']}", {})
+            row[f"Cache {label['result']}"] = int(value)
+            continue
+        row = rows.setdefault(label.get("provider", ""), {})
+        if name == "bytes_total":
+            column = f"MB {label['direction']}"
+            row[column] = round(row.get(column, 0) + value / 1e6, 2)
+        elif name == "audio_bytes_total":
+            row["Audio MB"] = round(value / 1e6, 2)
+        elif name == "tokens_total":
+            row[f"Tokens {label['direction']}"] = int(value)
+        elif name == "cost_usd_total":
+            row["Est. cost ($)"] = round(value, 4)
+    return [{"Source": source, **row} for source, row in rows.items()]
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+# The endpoint is unauthenticated, so it only listens locally unless
+# METRICS_HOST opts in to another interface (e.g. 0.0.0.0 for a remote scraper)
+METRICS_HOST = get_setting("METRICS_HOST", "127.0.0.1")
+
+
+class MetricsServer:
+    """Serves ``render_prometheus()`` at ``/metrics`` for a Prometheus scraper."""
+
+    def __init__(self, host: str = METRICS_HOST, port: int = 0):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+_metrics_server: Optional[MetricsServer] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics_server(port: int) -> MetricsServer:
+    """Return the process-wide metrics endpoint, starting it on first use."""
+    global _metrics_server
+    with _metrics_lock:
+        if _metrics_server is None:
+            _metrics_server = MetricsServer(port=port)
+    return _metrics_server
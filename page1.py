@@ -1,244 +1,55 @@
-from io import BytesIO
-import re
-from time import sleep
-import google.generativeai as genai
-from groq import Groq as GROQ
-import assemblyai as aai
-import requests
 import streamlit as st
-from openai import OpenAI
-from deepgram import DeepgramClient, FileSource, PrerecordedOptions
-from together import Together
-from page2 import library, prompts
+from audio import prepare_audio
+from cache import completion_cache
+from chunking import transcribe_chunked
+from dispatch import fan_out, race, transcribe
+from fetch import open_audio
+from generators import GENERATORS, stream_chat
+from history import ChatHistory, content_key
+from live import LIVE_PROVIDERS, LiveTranscriber, RollingDraft, audio_frames
+from config import get_setting
+from mapreduce import MAP_PROMPT_NAME
+from metrics import get_metrics_server, summary, usage
+from pipeline import PrdPipeline
+from transcribers import PROVIDERS
+from prompt_library import get_library
+from ratelimit import reporting, status
+from templates import DEFAULT_POLICY, estimate_tokens, token_budget
+
+CODECS_BY_LABEL = {"Off": None, "Opus (smallest)": "opus", "FLAC (lossless)": "flac"}
+POLICY_LABELS = {
+    "Truncate": "truncate",
+    "Summarize chunks first": "summarize",
+    "Map-reduce": "map_reduce",
+}
 
 
-@st.cache_data
-def score_prd(prd_text):
-    """Score PRD based on key metrics with simplified scoring."""
-    scores = {}
-
-    # Scoring criteria with their keywords and weights
-    criteria = {
-        "Clarity": (
-            ["maybe", "might", "possibly", "should", "consider", "could"],
-            0.20,
-        ),
-        "Completeness": (
-            [
-                "product overview",
-                "objectives",
-                "mvp",
-                "technical",
-                "user roles",
-                "metrics",
-            ],
-            0.25,
-        ),
-        "Feasibility": (
-            ["mvp", "minimum viable", "first release", "initial version"],
-            0.15,
-        ),
-        "Alignment": (
-            ["vision", "business goal", "strategy", "impact", "market"],
-            0.15,
-        ),
-        "Usability": (
-            [
-                "user flow",
-                "onboarding",
-                "interaction",
-                "metadata",
-                "description",
-                "tags",
-            ],
-            0.10,
-        ),
-        "Consistency": ([], 0.05),  # Special case - handled separately
-        "Testability": (
-            [
-                "success metric",
-                "kpi",
-                "quantitative",
-                "qualitative",
-                "goal",
-                "conversion",
-                "engagement",
-            ],
-            0.10,
-        ),
-    }
-
-    # Calculate scores for each criterion
-    for criterion, (keywords, weight) in criteria.items():
-        if criterion == "Consistency":
-            # Special handling for consistency - count section headers
-            headings = len(re.findall(r"^[0-9]+\.\s", prd_text, re.MULTILINE))
-            scores[criterion] = min(headings, 10)
-        else:
-            # Standard keyword-based scoring
-            matches = sum(1 for word in keywords if word in prd_text.lower())
-            scores[criterion] = min(matches * 2, 10)
-
-    # Calculate weighted total score
-    total_score = sum(
-        scores[criterion] * weight for criterion, (_, weight) in criteria.items()
-    )
-    scores["Total Score"] = round(total_score, 2)
-
-    return scores
-
-
-@st.cache_data
-def make_request(url, headers, method="GET", data=None, files=None):
-    if method == "POST":
-        response = requests.post(url, headers=headers, json=data, files=files)
-    else:
-        response = requests.get(url, headers=headers)
-    return response.json()
-
-
-@st.cache_data
-def Gladia(uploaded_file):
-    headers = {
-        "x-gladia-key": st.secrets["GLADIA_API_KEY"],  # Replace with your Gladia Token
-        "accept": "application/json",
-    }
-    if not toggle:
-        uploaded_file = BytesIO(requests.get(uploaded_file).content)
-        uploaded_file.name = "audio.webm"
-        print(uploaded_file)
-    files = {"audio": (uploaded_file.name, uploaded_file, "audio/webm")}
-    print("- Uploading file to Gladia...")
-    upload_response = make_request(
-        "https://api.gladia.io/v2/upload/", headers, "POST", files=files
-    )
-    print("Upload response with File ID:", upload_response)
-    audio_url = upload_response.get("audio_url")
-
-    data = {"audio_url": audio_url}
-
-    headers["Content-Type"] = "application/json"
-
-    print("- Sending request to Gladia API...")
-    post_response = make_request(
-        "https://api.gladia.io/v2/transcription/", headers, "POST", data=data
-    )
-
-    print("Post response with Transcription ID:", post_response)
-    result_url = post_response.get("result_url")
-
-    if result_url:
-        while True:
-            poll_response = make_request(result_url, headers)
-            if poll_response.get("status") == "done":
-                reply = poll_response.get("result")
-                break
-            elif poll_response.get("status") == "error":
-                reply = poll_response.get("error")
-            else:
-                reply = poll_response.get("status")
-            sleep(1)
-    return reply["transcription"]["full_transcript"]
-
-
-@st.cache_data
-def Deepgram(uploaded_file, input):
-    deepgram = DeepgramClient(st.secrets["secret"])
-    # STEP 2 Call the transcribe_file method on the rest class
-    if not toggle:
-        uploaded_file = BytesIO(requests.get(uploaded_file).content)
-        uploaded_file.name = "audio.webm"
-    payload: FileSource = {"buffer": uploaded_file, "mimetype": "video/webm"}
-
-    options = PrerecordedOptions(detect_language=True, model=input)
-    file_response = deepgram.listen.rest.v("1").transcribe_file(
-        payload, options, timeout=300
-    )
-    return file_response["results"]["channels"][0]["alternatives"][0]["transcript"]
-
-
-@st.cache_data
-def Assembly(uploaded_file):
-    aai.settings.api_key = st.secrets["ASSEMBLY_API_KEY"]
-    transcriber = aai.Transcriber()
-    if not toggle:
-        uploaded_file = BytesIO(requests.get(uploaded_file).content)
-        uploaded_file.name = "audio.webm"
-    audio_file = uploaded_file
-    config = aai.TranscriptionConfig(language_detection=True)
-    transcript = transcriber.transcribe(audio_file, config)
-    if transcript.status == aai.TranscriptStatus.error:
-        print(f"Transcription failed: {transcript.error}")
-        exit(1)
-    return transcript.text
-
-
-@st.cache_data
-def Whisper(uploaded_file):
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-    if toggle:
-        transcription = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=uploaded_file,
-        )
-    else:
-        audio = BytesIO(requests.get(uploaded_file).content)
-        audio.name = "audio.webm"
-        transcription = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio,
-        )
-    return transcription.text
-
-
-@st.cache_data
-def Groq(uploaded_file):
-    client = GROQ(api_key=st.secrets["GROQ"])
-    chat_completion = client.audio.transcriptions.create(
-        file=uploaded_file, model="whisper-large-v3-turbo"
-    )
-    return chat_completion.text
-
-
-@st.cache_data
-def Gemini(transcript, prompt):
-    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-    model = genai.GenerativeModel("models/gemini-1.5-flash")
-    response = model.generate_content(prompt["content"].format(transcript=transcript))
-    return response.text
-
-
-@st.cache_data
-def TogetherAI(transcript, prompt):
-    client = Together(api_key=st.secrets["TG_API_TOKEN"])
-    response = client.chat.completions.create(
-        model="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
-        messages=[
-            {"role": "user", "content": prompt["content"].format(transcript=transcript)}
-        ],
-    )
-    return response.choices[0].message.content
-
-
-@st.cache_data
-def ScoringGemini(transcript):
-    prompt = library.get_prompt("Scoring")
-    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-    model = genai.GenerativeModel("models/gemini-1.5-flash")
-    response = model.generate_content(prompt["content"].format(transcript=transcript))
-    return response.text
+st.title("PRD Generation")
 
+metrics_port = get_setting("METRICS_PORT")
+if metrics_port:
+    # Prometheus scrape target at http://<host>:<port>/metrics
+    get_metrics_server(int(metrics_port))
 
-st.title("PRD Generation")
+library = get_library()
+prompts = library.list_prompts()
 
 
 # Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "history" not in st.session_state:
+    st.session_state.history = ChatHistory()
+history = st.session_state.history
 if st.sidebar.button("Reset chat history"):
-    st.session_state.messages = []
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+    history.clear()
+queues = {name: state for name, state in status().items() if any(state.values())}
+if queues:
+    st.sidebar.caption("Provider queues (in flight / waiting)")
+    st.sidebar.table(queues)
+cache_stats = completion_cache.stats()
+st.sidebar.caption(
+    f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+    f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1e6:.1f} MB)"
+)
 # Accept user input
 toggle = st.toggle(label="📁")
 response = " "
@@ -250,38 +61,177 @@ else:
         placeholder="eg: https://www.example.com/recording.webm",
         value=None,
     )
-model = st.selectbox(
-    "Select the service to use for transcription",
-    ["Assembly", "Deepgram", "Gladia", "Groq", "Whisper"],
-    placeholder="eg : Whisper",
-    index=None,
+mode = st.radio(
+    "Transcription mode",
+    ["Single", "Race", "Compare", "Live"],
+    horizontal=True,
+    help="Race keeps the first transcript to come back, Compare shows them all, "
+    "Live streams the audio over WebSocket and drafts the PRD as the meeting goes",
 )
-if model == "Deepgram":
+if mode == "Single":
+    model = st.selectbox(
+        "Select the service to use for transcription",
+        list(PROVIDERS),
+        placeholder="eg : Whisper",
+        index=None,
+    )
+    selected = [model] if model is not None else []
+    split = st.checkbox(
+        "Split long recordings",
+        help="Cut the audio at silences and transcribe the pieces in parallel",
+    )
+    if split:
+        segment_minutes = st.slider("Segment length (minutes)", 2, 20, 10)
+elif mode == "Live":
+    live_provider = st.selectbox(
+        "Select the service to stream the audio to", list(LIVE_PROVIDERS)
+    )
+    selected = [live_provider]
+    recording = st.audio_input("Or record from the microphone")
+    if recording is not None:
+        uploaded_file = recording
+    draft_model = st.selectbox(
+        "Model for the rolling PRD draft",
+        list(GENERATORS),
+        placeholder="Select an AI model",
+        index=None,
+    )
+    draft_prompt = st.selectbox(
+        "Prompt for the rolling PRD draft",
+        [p["name"] for p in prompts],
+        key="live_prompt_select",
+        format_func=lambda x: f"📄 {x}",
+    )
+    realtime = st.checkbox(
+        "Stream at meeting speed",
+        value=True,
+        help="Send the recording as fast as it was spoken, like a live meeting",
+    )
+    start_live = st.button("Start live session", disabled=draft_model is None)
+else:
+    selected = st.multiselect(
+        "Select the services to run concurrently",
+        list(PROVIDERS),
+        placeholder="eg : Deepgram, Whisper",
+    )
+shrink = st.selectbox(
+    "Pre-processing",
+    list(CODECS_BY_LABEL),
+    help="Strip video and re-encode to mono 16 kHz before uploading",
+)
+options = {}
+if "Deepgram" in selected:
     input = st.text_input(
         "Type the name of the model you want to use : ",
         value="nova-2",
         placeholder="eg : nova-2",
     )
+    options["Deepgram"] = (input,)
 if uploaded_file is not None:
-    st.session_state.messages.append({"role": "user", "content": uploaded_file})
-    if toggle:
+    history.add_recording(uploaded_file)
+    if not isinstance(uploaded_file, str):
         with st.chat_message("user"):
             st.markdown("File Uploaded with Success !")
     else:
         with st.chat_message("user"):
             st.markdown("Link Successfully Added ! ")
-    with st.chat_message("assistant"):
-        if model == "Deepgram":
-            response = Deepgram(uploaded_file, input)
-        else:
-            if model is not None:
-                response = eval(model)(uploaded_file)
+    with st.chat_message("assistant"), prepare_audio(
+        uploaded_file,
+        # Live mode decodes to PCM itself, shrinking first would be wasted work
+        CODECS_BY_LABEL[shrink] if selected and mode != "Live" else None,
+    ) as audio:
+        if audio is not uploaded_file:
+            st.caption(
+                f"Audio shrunk from {audio.original_size / 1e6:.1f} MB "
+                f"to {audio.seek(0, 2) / 1e6:.1f} MB before upload"
+            )
+            audio.seek(0)
+        if mode == "Single" and selected and split:
+            stitched = transcribe_chunked(
+                model,
+                audio,
+                *options.get(model, ()),
+                target=segment_minutes * 60,
+            )
+            st.caption(f"Transcribed in {len(stitched.segments)} segments")
+            response = stitched.text
+        elif mode == "Single" and selected:
+            queue_note = st.empty()
+            with reporting(
+                lambda provider, position: queue_note.info(
+                    f"Waiting for {provider}: position {position} in the queue"
+                )
+            ):
+                response = transcribe(model, audio, *options.get(model, ()))
+            queue_note.empty()
+        elif mode == "Race" and selected:
+            winner = race(audio, selected, options)
+            if winner.ok:
+                st.caption(f"{winner.provider} answered first in {winner.seconds:.1f}s")
+                response = winner.text
+            else:
+                st.error(f"All services failed, last error: {winner.error}")
+        elif mode == "Compare" and selected:
+            results = fan_out(audio, selected, options)
+            for column, result in zip(st.columns(len(results)), results):
+                with column:
+                    st.markdown(f"**{result.provider}** · {result.seconds:.1f}s")
+                    st.write(result.text if result.ok else f"❌ {result.error}")
+            succeeded = {
+                result.provider: result.text for result in results if result.ok
+            }
+            if succeeded:
+                chosen = st.radio(
+                    "Transcript to use for the PRD", list(succeeded), horizontal=True
+                )
+                response = succeeded[chosen]
+        elif mode == "Live":
+            if start_live and draft_prompt:
+                said, draft_box = st.empty(), st.empty()
+                draft = RollingDraft(
+                    draft_model,
+                    library.get_prompt(draft_prompt),
+                    library.get_prompt(MAP_PROMPT_NAME),
+                )
+                with open_audio(audio) as stream:
+                    transcriber = LiveTranscriber(
+                        audio_frames(stream, realtime=realtime),
+                        live_provider,
+                        *options.get(live_provider, ()),
+                    )
+                    version = 0
+                    for segment in transcriber.segments():
+                        draft.add(segment)
+                        interim = "" if segment.is_final else f" *{segment.text}*"
+                        said.markdown(transcriber.final_text + interim)
+                        if draft.version != version:
+                            version = draft.version
+                            draft_box.markdown(draft.draft)
+                said.empty()
+                with st.spinner("Meeting ended, finishing the PRD draft"):
+                    draft_box.markdown(draft.finish())
+                # Kept so the reruns triggered by later widgets do not restream
+                st.session_state.live = {
+                    "transcript": transcriber.final_text,
+                    "draft": draft.draft,
+                }
+            elif "live" in st.session_state:
+                st.markdown(st.session_state.live["draft"])
+            if "live" in st.session_state:
+                live = st.session_state.live
+                response = live["transcript"]
+                history.add(
+                    "assistant", live["draft"], "prd", content_key("prd", live["draft"])
+                )
 st.write(response)
-st.session_state.messages.append({"role": "assistant", "content": response})
+if response.strip():
+    history.add(
+        "assistant", response, "transcript", content_key("transcript", response)
+    )
 if response.strip() != " ":  # Only show if there's a transcript
     ai_model = st.selectbox(
         "Select AI Model for Processing",
-        ["TogetherAI", "Gemini"],
+        list(GENERATORS),
         placeholder="Select an AI model",
         index=None,
     )
@@ -298,27 +248,78 @@ if response.strip() != " ":  # Only show if there's a transcript
             prompt = library.get_prompt(selected_prompt)
     else:
         st.info("No prompts available in library")
+    policy = st.selectbox(
+        "Long transcript handling",
+        list(POLICY_LABELS),
+        index=list(POLICY_LABELS.values()).index(DEFAULT_POLICY),
+        help="What to do when the transcript does not fit the model's token budget",
+    )
+    if ai_model is not None:
+        st.caption(
+            f"Transcript ≈ {estimate_tokens(response):,} tokens, "
+            f"{ai_model} budget {token_budget(ai_model):,} tokens"
+        )
     if ai_model is not None and prompts:
-        analysis = eval(ai_model)(response, prompt)
+        pipeline = PrdPipeline(
+            ai_model,
+            response,
+            prompt,
+            library.get_prompt("Scoring"),
+            policy=POLICY_LABELS[policy],
+            map_prompt=library.get_prompt(MAP_PROMPT_NAME),
+        )
         with st.chat_message("assistant"):
+            live_score = st.empty()
+            with reporting(
+                lambda provider, position: live_score.info(
+                    f"Waiting for {provider}: position {position} in the queue"
+                )
+            ):
+                analysis = st.write_stream(
+                    pipeline.stream_prd(
+                        on_score=lambda scores: live_score.caption(
+                            f"Heuristic score so far: {scores['Total Score']}"
+                        )
+                    )
+                )
             response = analysis
-        st.markdown(response)
-        st.session_state.messages.append({"role": "assistant", "content": analysis})
+            if pipeline.timings:
+                st.caption(
+                    " · ".join(
+                        f"{stage} {seconds:.1f}s"
+                        for stage, seconds in pipeline.timings.items()
+                    )
+                )
+        history.add("assistant", analysis, "prd", content_key("prd", analysis))
         with st.chat_message("assistant"):
-            second_response = ScoringGemini(analysis)
-        st.session_state.messages.append(
-            {"role": "assistant", "content": second_response}
+            heuristic, llm = st.columns([1, 2])
+            with heuristic:
+                st.markdown("**Heuristic score**")
+                st.table(
+                    [
+                        {"Criterion": criterion, "Score": score}
+                        for criterion, score in pipeline.local_score.items()
+                    ]
+                )
+            with llm:
+                second_response = st.write_stream(pipeline.stream_llm_score())
+        history.add(
+            "assistant", second_response, "score", content_key("score", second_response)
         )
-        st.markdown(second_response)
-if prompt := st.chat_input("What is up?"):
+with st.expander("Pipeline timings"):
+    timings = summary()
+    if timings:
+        st.dataframe(timings, hide_index=True)
+        st.dataframe(usage(), hide_index=True)
+    else:
+        st.caption("Nothing measured yet in this process")
+if question := st.chat_input("What is up?"):
     # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    history.add("user", question)
     # Display user message in chat message container
     with st.chat_message("user"):
-        st.markdown(prompt)
+        st.markdown(question)
     with st.chat_message("assistant"):
-        stream = model.generate_content(
-            m["content"] for m in st.session_state.messages if m["role"] == "user"
-        )
-        response = st.write_stream(stream)
-    st.session_state.messages.append({"role": "assistant", "content": response})
+        # Transcript, PRD and earlier turns, newest first, within the token budget
+        response = st.write_stream(stream_chat("Gemini", history.context()))
+    history.add("assistant", response)
@@ -1,7 +1,6 @@
-import json
-import os
 import streamlit as st
-from typing import Dict, List, Optional
+from prompt_library import get_library
+from templates import TemplateError, compile_template
 
 # Initialize session state
 if 'show_add' not in st.session_state:
@@ -13,73 +12,9 @@ if 'show_delete' not in st.session_state:
 if 'show_clear' not in st.session_state:
     st.session_state.show_clear = False
 
-global library, prompts
-# Global variables
-library = None
-prompts = None
-
-class PromptLibrary:
-    def __init__(self, storage_path: str = "prompts.json"):
-        self.storage_path = storage_path
-        self.prompts = self._load_prompts()
-
-    def _load_prompts(self) -> Dict[str, List[Dict]]:
-        """Load prompts from storage file."""
-        if os.path.exists(self.storage_path):
-            with open(self.storage_path, 'r') as f:
-                return json.load(f)
-        return {"PRD": []}
-
-    def _save_prompts(self) -> None:
-        """Save prompts to storage file."""
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.prompts, f, indent=2)
-
-    def add_prompt(self, name: str, content: str, description: str = "") -> None:
-        """Add a new prompt to the library."""
-        
-        prompt = {
-            "name": name,
-            "content": content,
-            "description": description
-        }
-        self.prompts["PRD"].append(prompt)
-        self._save_prompts()
-
-    def get_prompt(self, name: str) -> Optional[Dict]:
-        """Retrieve a prompt by name."""
-        for prompt in self.prompts["PRD"]:
-            if prompt["name"] == name:
-                return prompt
-        return None
-
-    def list_prompts(self) -> List[Dict]:
-        """List all prompts."""
-        return self.prompts["PRD"]
-
-    def delete_prompt(self, name: str) -> bool:
-        """Delete a prompt from the library."""
-        for i, prompt in enumerate(self.prompts["PRD"]):
-            if prompt["name"] == name:
-                self.prompts["PRD"].pop(i)
-                self._save_prompts()
-                return True
-        return False
-
-    def clear_all_prompts(self) -> None:
-        """Clear all prompts from the library."""
-        self.prompts["PRD"] = []
-        self._save_prompts()
-
-def initialize_globals():
-    """Initialize global variables."""
-    global library, prompts
-    if library is None:
-        library = PromptLibrary()
-    if prompts is None:
-        prompts = library.list_prompts()
-
-initialize_globals()
+# Shared by every session in this process; re-reads only what changed on disk
+library = get_library()
+prompts = library.list_prompts()
 
 # Main container with dark theme styling
 st.markdown("""
@@ -111,10 +46,15 @@ with main_content:
             with col1:
                 submit = st.form_submit_button("Save", type="primary")
                 if submit and name and content:
-                    library.add_prompt(name, content, description)
-                    st.session_state.show_add = False
-                    st.success("✅ Prompt saved")
-                    st.rerun()
+                    try:
+                        compile_template(content)
+                    except TemplateError as e:
+                        st.error(f"❌ {e}")
+                    else:
+                        library.add_prompt(name, content, description)
+                        st.session_state.show_add = False
+                        st.success("✅ Prompt saved")
+                        st.rerun()
             with col2:
                 if st.form_submit_button("Cancel"):
                     st.session_state.show_add = False
@@ -159,11 +99,15 @@ with main_content:
                             col1, col2 = st.columns([1, 1])
                             with col1:
                                 if st.form_submit_button("Save Changes", type="primary"):
-                                    library.delete_prompt(selected_prompt)
-                                    library.add_prompt(selected_prompt, new_content, new_description)
-                                    st.session_state.show_edit = False
-                                    st.success("✅ Changes saved")
-                                    st.rerun()
+                                    try:
+                                        compile_template(new_content)
+                                    except TemplateError as e:
+                                        st.error(f"❌ {e}")
+                                    else:
+                                        library.update_prompt(selected_prompt, new_content, new_description)
+                                        st.session_state.show_edit = False
+                                        st.success("✅ Changes saved")
+                                        st.rerun()
                             with col2:
                                 if st.form_submit_button("Cancel"):
                                     st.session_state.show_edit = False
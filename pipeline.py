@@ -0,0 +1,104 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
+
+from generators import stream_completion
+from mapreduce import MapReduce
+from metrics import timed
+from scoring import score_prd
+from templates import DEFAULT_POLICY
+
+RESCORE_INTERVAL = 0.5
+SCORING_MODEL = "Gemini"
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pipeline")
+_DONE = object()
+
+
+class PrdPipeline:
+    """Transcript -> PRD -> scores, with the scoring stages overlapped.
+
+    ``score_prd`` runs on the partial PRD while it streams, and the LLM
+    scoring request is sent from a worker thread the moment the last PRD
+    token arrives, so it is already running while the page renders.
+    """
+
+    def __init__(
+        self,
+        generator: str,
+        transcript: str,
+        prompt: Dict,
+        scoring_prompt: Optional[Dict] = None,
+        rescore_interval: float = RESCORE_INTERVAL,
+        policy: str = DEFAULT_POLICY,
+        map_prompt: Optional[Dict] = None,
+    ):
+        self.generator = generator
+        self.transcript = transcript
+        self.prompt = prompt
+        self.scoring_prompt = scoring_prompt
+        self.rescore_interval = rescore_interval
+        self.policy = policy
+        self.map_prompt = map_prompt
+        self.text = ""
+        # Seconds per stage of map-reduce generation
+        self.timings: Dict[str, float] = {}
+        self.local_score: Dict = {}
+        self._llm_parts: "queue.Queue" = queue.Queue()
+
+    def stream_prd(
+        self, on_score: Optional[Callable[[Dict], None]] = None
+    ) -> Iterator[str]:
+        """Yield PRD tokens, re-scoring the partial text every ``rescore_interval``."""
+        parts = []
+        last_scored = time.monotonic()
+        if self.policy == "map_reduce":
+            map_reduce = MapReduce(
+                self.generator, self.transcript, self.prompt, self.map_prompt
+            )
+            self.timings = map_reduce.timings
+            stream = map_reduce.stream()
+        else:
+            stream = stream_completion(
+                self.generator, self.transcript, self.prompt, self.policy
+            )
+        with timed("prd", self.generator):
+            for part in stream:
+                parts.append(part)
+                yield part
+                if on_score and time.monotonic() - last_scored >= self.rescore_interval:
+                    self.local_score = score_prd("".join(parts))
+                    on_score(self.local_score)
+                    last_scored = time.monotonic()
+        self.text = "".join(parts)
+        if self.scoring_prompt is not None:
+            _executor.submit(self._score_with_llm)
+        else:
+            self._llm_parts.put(_DONE)
+        with timed("score_local"):
+            self.local_score = score_prd(self.text)
+        if on_score:
+            on_score(self.local_score)
+
+    def _score_with_llm(self) -> None:
+        try:
+            with timed("score_llm", SCORING_MODEL):
+                for part in stream_completion(
+                    SCORING_MODEL, self.text, self.scoring_prompt, self.policy
+                ):
+                    self._llm_parts.put(part)
+        except Exception as e:
+            self._llm_parts.put(e)
+        finally:
+            self._llm_parts.put(_DONE)
+
+    def stream_llm_score(self) -> Iterator[str]:
+        """Yield the LLM scoring tokens as the worker thread receives them."""
+        while True:
+            part = self._llm_parts.get()
+            if part is _DONE:
+                return
+            if isinstance(part, Exception):
+                raise part
+            yield part
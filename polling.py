@@ -0,0 +1,195 @@
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from fetch import check_cancelled
+from http_client import request
+
+DEFAULT_DEADLINE = 30 * 60
+MIN_INTERVAL = 1.0
+MAX_INTERVAL = 30.0
+GROWTH = 1.5
+
+
+class PollError(RuntimeError):
+    """The remote job finished with an error status."""
+
+
+class PollTimeout(TimeoutError):
+    """The remote job did not finish before the deadline."""
+
+
+def poll_intervals(duration: Optional[float] = None) -> Iterator[float]:
+    """Yield sleep intervals sized to the audio duration, growing geometrically.
+
+    Short clips are checked every second; an hour-long recording starts at
+    a few seconds and backs off to ``MAX_INTERVAL``.
+    """
+    if duration:
+        interval = min(max(duration / 600, MIN_INTERVAL), MAX_INTERVAL / 4)
+        ceiling = min(max(duration / 60, MIN_INTERVAL * 2), MAX_INTERVAL)
+    else:
+        interval, ceiling = MIN_INTERVAL, MAX_INTERVAL / 2
+    while True:
+        yield interval
+        interval = min(interval * GROWTH, ceiling)
+
+
+def poll(
+    url: str,
+    headers: dict,
+    duration: Optional[float] = None,
+    deadline: Optional[float] = None,
+    done: str = "done",
+    error: str = "error",
+    cancel: Optional[threading.Event] = None,
+) -> Dict:
+    """GET ``url`` until its status is ``done`` and return the final response.
+
+    Raises PollError when the job reports ``error``, PollTimeout once
+    ``deadline`` seconds have passed and ``fetch.Cancelled`` as soon as
+    ``cancel`` is set.
+    """
+    end = time.monotonic() + (DEFAULT_DEADLINE if deadline is None else deadline)
+    for interval in poll_intervals(duration):
+        check_cancelled(cancel, url)
+        response = request("GET", url, headers=headers).json()
+        status = response.get("status")
+        if status == done:
+            return response
+        if status == error:
+            raise PollError(response.get("error") or f"Job at {url} failed")
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise PollTimeout(f"Job at {url} still '{status}' after deadline")
+        if cancel is not None:
+            cancel.wait(min(interval, remaining))
+        else:
+            time.sleep(min(interval, remaining))
+
+
+class CallbackServer:
+    """Local HTTP listener that wakes waiters when a webhook arrives.
+
+    Each job is registered with ``expect()`` before it is submitted, which
+    gives it a secret token to put in its callback URL; a webhook is only
+    accepted with the token of a job still being waited on, so stray or
+    forged requests never pile up. Any path is accepted so the same
+    listener can serve several providers.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._events: Dict[str, threading.Event] = {}
+        self._payloads: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    body = {}
+                query = parse_qs(urlsplit(self.path).query)
+                token = query.get("token", [""])[0]
+                accepted = isinstance(body, dict) and server.notify(token, body)
+                self.send_response(200 if accepted else 404)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    @contextmanager
+    def expect(self) -> Iterator[str]:
+        """Register a job and yield the token its webhook must carry."""
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._events[token] = threading.Event()
+        try:
+            yield token
+        finally:
+            self._discard(token)
+
+    @staticmethod
+    def callback_url(url: str, token: str) -> str:
+        """``url`` with the job's token added to its query string."""
+        return f"{url}{'&' if '?' in url else '?'}{urlencode({'token': token})}"
+
+    def _discard(self, token: str) -> None:
+        with self._lock:
+            self._events.pop(token, None)
+            self._payloads.pop(token, None)
+
+    def notify(self, token: str, payload: Dict) -> bool:
+        """Record a webhook payload and wake the waiter registered under ``token``.
+
+        Returns False, storing nothing, for a token nobody is waiting on.
+        """
+        with self._lock:
+            event = self._events.get(token)
+            if event is None:
+                return False
+            self._payloads[token] = payload
+        event.set()
+        return True
+
+    def wait(
+        self,
+        token: str,
+        timeout: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[Dict]:
+        """Block until the webhook for ``token`` arrives or ``timeout`` expires.
+
+        The job is forgotten however the wait ends. Raises
+        ``fetch.Cancelled`` once ``cancel`` is set.
+        """
+        with self._lock:
+            event = self._events.get(token)
+        if event is None:
+            return None
+        end = None if timeout is None else time.monotonic() + timeout
+        try:
+            while not event.is_set():
+                check_cancelled(cancel, token)
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                # Wake up now and then to notice a cancellation
+                event.wait(
+                    MIN_INTERVAL if remaining is None else min(remaining, MIN_INTERVAL)
+                )
+            with self._lock:
+                return self._payloads.get(token)
+        finally:
+            self._discard(token)
+
+    def shutdown(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+_callback_server: Optional[CallbackServer] = None
+_callback_lock = threading.Lock()
+
+
+def get_callback_server(port: int, host: str = "127.0.0.1") -> CallbackServer:
+    """Return the process-wide webhook listener, starting it on first use.
+
+    Raises ``OSError`` when the port is taken, e.g. by another worker.
+    """
+    global _callback_server
+    with _callback_lock:
+        if _callback_server is None:
+            _callback_server = CallbackServer(host, port)
+    return _callback_server
@@ -0,0 +1,260 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import streamlit as st
+
+from cache import invalidate_completions
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked writes
+    fcntl = None
+
+# Rewrite the snapshot and empty the log once it holds this many changes
+COMPACT_AFTER = 200
+
+
+class PromptLibrary:
+    """Prompt templates indexed by name, persisted as a snapshot plus a change log.
+
+    ``prompts.json`` keeps the original ``{"PRD": [...]}`` layout and is only
+    rewritten, atomically, when the log is compacted. Every change appends a
+    single JSON line to ``prompts.json.log`` under an exclusive file lock,
+    after first replaying lines other processes appended, so concurrent
+    sessions no longer overwrite each other's edits.
+    """
+
+    def __init__(self, storage_path: str = "prompts.json"):
+        self.storage_path = storage_path
+        self.log_path = storage_path + ".log"
+        self.lock_path = storage_path + ".lock"
+        # Bumped on every change seen, local or from another process
+        self.version = 0
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._pending: List[Dict] = []
+        self._mutex = threading.RLock()
+        self._index: Dict[str, Dict] = {}
+        self._snapshot_id = None
+        self._log_id = None
+        self._log_offset = 0
+        self._log_entries = 0
+        self._load_prompts()
+        self._pending.clear()
+
+    @staticmethod
+    def _file_id(path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load_prompts(self) -> None:
+        """Load the snapshot, then replay the change log on top of it."""
+        index: Dict[str, Dict] = {}
+        self._snapshot_id = self._file_id(self.storage_path)
+        if self._snapshot_id is not None:
+            with open(self.storage_path, "r") as f:
+                for prompt in json.load(f).get("PRD", []):
+                    index.setdefault(prompt["name"], prompt)
+        self._log_id = None
+        self._log_offset = 0
+        self._log_entries = 0
+        self._changed({"op": "reload"})
+        self._replay_log(index)
+
+    def _replay_log(self, index: Optional[Dict[str, Dict]] = None) -> None:
+        """Apply log lines appended since the last read, by this or another process.
+
+        Changes go to a copy of the index (or to ``index``) that replaces it
+        once complete, so readers, who take no lock, never see it half built.
+        """
+        index = dict(self._index) if index is None else index
+        try:
+            f = open(self.log_path, "r")
+        except FileNotFoundError:
+            self._index = index
+            return
+        with f:
+            log_id = os.fstat(f.fileno()).st_ino
+            if log_id != self._log_id:
+                self._log_id, self._log_offset = log_id, 0
+            f.seek(self._log_offset)
+            for line in iter(f.readline, ""):
+                if not line.endswith("\n"):
+                    break  # a writer is mid-append; pick it up next time
+                self._apply(json.loads(line), index)
+                self._log_entries += 1
+                self._log_offset = f.tell()
+        self._index = index
+
+    def _apply(self, change: Dict, index: Dict[str, Dict]) -> None:
+        op = change["op"]
+        if op == "put":
+            index[change["prompt"]["name"]] = change["prompt"]
+        elif op == "update" and change["name"] in index:
+            # A new dict: callers and "put" records may still hold the old one
+            index[change["name"]] = {**index[change["name"]], **change["fields"]}
+        elif op == "delete":
+            index.pop(change["name"], None)
+        elif op == "clear":
+            index.clear()
+        self._changed(change)
+
+    def _changed(self, change: Dict) -> None:
+        self.version += 1
+        self._pending.append(change)
+
+    def _notify(self) -> None:
+        """Hand queued changes to subscribers, outside the file lock."""
+        with self._mutex:
+            pending, self._pending = self._pending, []
+            subscribers = list(self._subscribers)
+        for change in pending:
+            for callback in subscribers:
+                callback(change)
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """Call ``callback(change)`` after every change; returns an unsubscribe function.
+
+        ``change`` is the log record (``{"op": "put", "prompt": ...}``,
+        ``{"op": "update" | "delete", "name": ...}``, ``{"op": "clear"}``) or
+        ``{"op": "reload"}`` when the whole library was re-read.
+        """
+        with self._mutex:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _log_state(self):
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def refresh(self) -> bool:
+        """Pick up changes made by other processes; returns True if any were found.
+
+        Costs two ``stat`` calls when nothing changed; otherwise only the new
+        tail of the log is read, or everything after a compaction.
+        """
+        version = self.version
+        with self._mutex:
+            if self._file_id(self.storage_path) != self._snapshot_id:
+                self._load_prompts()
+            elif self._log_state() != (self._log_id, self._log_offset):
+                self._replay_log()
+        self._notify()
+        return self.version != version
+
+    @contextmanager
+    def _locked(self):
+        """Hold the library's write lock, synced with changes made elsewhere."""
+        with self._mutex, open(self.lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self._file_id(self.storage_path) != self._snapshot_id:
+                    self._load_prompts()  # another process compacted the log
+                else:
+                    self._replay_log()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        self._notify()
+
+    def _append(self, change: Dict) -> None:
+        """Apply a change and append it to the log; caller holds the lock."""
+        index = dict(self._index)
+        self._apply(change, index)
+        self._index = index
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(change) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self._log_id = os.fstat(f.fileno()).st_ino
+            self._log_offset = f.tell()
+        self._log_entries += 1
+        if self._log_entries >= COMPACT_AFTER:
+            self._save_prompts()
+
+    def _save_prompts(self) -> None:
+        """Atomically rewrite the snapshot and start an empty log; caller holds the lock."""
+        directory = os.path.dirname(os.path.abspath(self.storage_path))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, suffix=".tmp"
+        ) as f:
+            json.dump({"PRD": list(self._index.values())}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f.name, self.storage_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._snapshot_id = self._file_id(self.storage_path)
+        self._log_id = None
+        self._log_offset = 0
+        self._log_entries = 0
+
+    def add_prompt(self, name: str, content: str, description: str = "") -> None:
+        """Add a new prompt to the library, replacing any prompt with that name."""
+        prompt = {"name": name, "content": content, "description": description}
+        with self._locked():
+            self._append({"op": "put", "prompt": prompt})
+
+    def update_prompt(
+        self,
+        name: str,
+        content: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> bool:
+        """Change a prompt's content and/or description in place."""
+        fields = {
+            key: value
+            for key, value in (("content", content), ("description", description))
+            if value is not None
+        }
+        with self._locked():
+            if name not in self._index:
+                return False
+            self._append({"op": "update", "name": name, "fields": fields})
+        return True
+
+    def get_prompt(self, name: str) -> Optional[Dict]:
+        """Retrieve a prompt by name."""
+        return self._index.get(name)
+
+    def list_prompts(self) -> List[Dict]:
+        """List all prompts."""
+        return list(self._index.values())
+
+    def delete_prompt(self, name: str) -> bool:
+        """Delete a prompt from the library."""
+        with self._locked():
+            if name not in self._index:
+                return False
+            self._append({"op": "delete", "name": name})
+        return True
+
+    def clear_all_prompts(self) -> None:
+        """Clear all prompts from the library."""
+        with self._locked():
+            self._append({"op": "clear"})
+
+
+@st.cache_resource
+def _shared_library(storage_path: str) -> PromptLibrary:
+    library = PromptLibrary(storage_path)
+    library.subscribe(invalidate_completions)
+    return library
+
+
+def get_library(storage_path: str = "prompts.json") -> PromptLibrary:
+    """The process-wide library shared by every session, refreshed if the files changed."""
+    library = _shared_library(storage_path)
+    library.refresh()
+    return library
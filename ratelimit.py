@@ -0,0 +1,295 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from config import get_setting
+from metrics import observe
+
+# Concurrent calls per provider unless <NAME>_MAX_CONCURRENCY is set
+DEFAULT_CONCURRENCY = int(get_setting("PROVIDER_MAX_CONCURRENCY", 4))
+# Set to a SQLite path to share limits between processes on this machine
+SHARED_DB = get_setting("RATE_LIMIT_DB")
+# A cross-process slot not renewed for this long is assumed abandoned (its
+# process died); slots still held are renewed every RENEW_SECONDS, however
+# long the call runs
+LEASE_SECONDS = 60
+RENEW_SECONDS = LEASE_SECONDS / 3
+MAX_SLEEP = 1.0
+# Another process frees its slots without waking us, so poll for them
+SHARED_POLL = 0.25
+
+_reporter = threading.local()
+
+
+@contextmanager
+def reporting(callback: Callable[[str, int], None]):
+    """Call ``callback(provider, position)`` while calls on this thread are queued."""
+    previous = getattr(_reporter, "callback", None)
+    _reporter.callback = callback
+    try:
+        yield
+    finally:
+        _reporter.callback = previous
+
+
+class SharedState:
+    """Token buckets and concurrency leases kept in SQLite for several processes.
+
+    A background thread keeps extending the leases this process holds, so a
+    Gladia job or a live session that runs for an hour keeps its slot, while
+    the slots of a crashed process free up within ``LEASE_SECONDS``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._held = set()
+        self._held_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "id TEXT PRIMARY KEY, name TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+        threading.Thread(target=self._renew, daemon=True, name="lease-renew").start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def try_acquire(
+        self, name: str, rate: Optional[float], burst: float, concurrency: int
+    ):
+        """Take a token and a slot; returns ``(lease_id, 0)`` or ``(None, wait)``."""
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM leases WHERE expires < ?", (now,))
+            (held,) = db.execute(
+                "SELECT COUNT(*) FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if held >= concurrency:
+                return None, SHARED_POLL
+            if rate:
+                row = db.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                tokens, updated = row if row else (burst, now)
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens < 1:
+                    return None, (1 - tokens) / rate
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                    (name, tokens - 1, now),
+                )
+            lease = uuid.uuid4().hex
+            db.execute(
+                "INSERT INTO leases VALUES (?, ?, ?)",
+                (lease, name, now + LEASE_SECONDS),
+            )
+            with self._held_lock:
+                self._held.add(lease)
+            return lease, 0.0
+        finally:
+            db.execute("COMMIT")
+
+    def release(self, lease: str) -> None:
+        with self._held_lock:
+            self._held.discard(lease)
+        self._connect().execute("DELETE FROM leases WHERE id = ?", (lease,))
+
+    def _renew(self) -> None:
+        while True:
+            time.sleep(RENEW_SECONDS)
+            with self._held_lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                self._connect().execute(
+                    f"UPDATE leases SET expires = ? WHERE id IN "
+                    f"({','.join('?' * len(held))})",
+                    (time.time() + LEASE_SECONDS, *held),
+                )
+            except sqlite3.Error as e:
+                print(f"- Could not renew rate-limit leases: {e}")
+
+
+class Limiter:
+    """Token bucket plus concurrency cap for one provider.
+
+    Callers queue in arrival order; only the head of the queue may take a
+    token and a slot, so a burst of sessions is served first come, first
+    served instead of all retrying against the provider's 429s. ``rate``
+    is in calls per second (``None`` for no rate limit) and ``burst`` is
+    the bucket size.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        burst: float = 1,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        shared: Optional[SharedState] = None,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.concurrency = concurrency
+        self.shared = shared
+        self.active = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._queue: "deque[object]" = deque()
+        self._cond = threading.Condition()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    def _try_take(self):
+        """Take a token and slot locally (and in SQLite if shared); caller holds the lock."""
+        if self.active >= self.concurrency:
+            return None, MAX_SLEEP
+        if self.shared is not None:
+            return self.shared.try_acquire(
+                self.name, self.rate, self.burst, self.concurrency
+            )
+        if self.rate:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                return None, (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        return True, 0.0
+
+    def acquire(self, on_wait: Optional[Callable[[str, int], None]] = None):
+        """Block until this call may go ahead; returns a token for ``release``."""
+        ticket = object()
+        start = time.perf_counter()
+        with self._cond:
+            self._queue.append(ticket)
+            reported = None
+            try:
+                while True:
+                    position = self._queue.index(ticket)
+                    if position == 0:
+                        lease, delay = self._try_take()
+                        if lease is not None:
+                            self._queue.popleft()
+                            self.active += 1
+                            self._cond.notify_all()
+                            observe(
+                                "stage_seconds",
+                                time.perf_counter() - start,
+                                stage="queue",
+                                provider=self.name,
+                                status="ok",
+                            )
+                            return lease
+                    else:
+                        delay = None
+                    if position != reported:
+                        reported = position
+                        print(f"- {self.name}: queued at position {position + 1}")
+                        if on_wait:
+                            on_wait(self.name, position + 1)
+                    self._cond.wait(min(delay, MAX_SLEEP) if delay else MAX_SLEEP)
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+                raise
+
+    def release(self, lease) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+        if self.shared is not None and lease is not True:
+            self.shared.release(lease)
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of one provider call."""
+        lease = self.acquire(getattr(_reporter, "callback", None))
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+
+_limiters: Dict[str, Limiter] = {}
+_limiters_lock = threading.Lock()
+_shared: Optional[SharedState] = None
+
+
+def get_limiter(name: str) -> Limiter:
+    """The process-wide limiter for provider ``name``, configured from settings.
+
+    ``<NAME>_RATE_LIMIT`` is calls per minute, ``<NAME>_BURST`` the calls
+    allowed back to back (default 1) and ``<NAME>_MAX_CONCURRENCY`` the
+    calls in flight at once.
+    """
+    global _shared
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            prefix = name.upper()
+            per_minute = get_setting(f"{prefix}_RATE_LIMIT")
+            if SHARED_DB and _shared is None:
+                _shared = SharedState(SHARED_DB)
+            limiter = _limiters[name] = Limiter(
+                name,
+                rate=float(per_minute) / 60 if per_minute else None,
+                burst=float(get_setting(f"{prefix}_BURST", 1)),
+                concurrency=int(
+                    get_setting(f"{prefix}_MAX_CONCURRENCY", DEFAULT_CONCURRENCY)
+                ),
+                shared=_shared,
+            )
+    return limiter
+
+
+def rate_limited(name: str):
+    """Run the decorated provider call inside ``name``'s limiter."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_limiter(name).slot():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def status() -> Dict[str, Dict[str, int]]:
+    """Calls in flight and queued per provider in this process."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {
+        limiter.name: {"active": limiter.active, "waiting": limiter.waiting}
+        for limiter in limiters
+    }
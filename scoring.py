@@ -0,0 +1,134 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Scoring criteria with their keywords and weights
+CRITERIA = {
+    "Clarity": (
+        ["maybe", "might", "possibly", "should", "consider", "could"],
+        0.20,
+    ),
+    "Completeness": (
+        [
+            "product overview",
+            "objectives",
+            "mvp",
+            "technical",
+            "user roles",
+            "metrics",
+        ],
+        0.25,
+    ),
+    "Feasibility": (
+        ["mvp", "minimum viable", "first release", "initial version"],
+        0.15,
+    ),
+    "Alignment": (
+        ["vision", "business goal", "strategy", "impact", "market"],
+        0.15,
+    ),
+    "Usability": (
+        [
+            "user flow",
+            "onboarding",
+            "interaction",
+            "metadata",
+            "description",
+            "tags",
+        ],
+        0.10,
+    ),
+    "Consistency": ([], 0.05),  # Special case - handled separately
+    "Testability": (
+        [
+            "success metric",
+            "kpi",
+            "quantitative",
+            "qualitative",
+            "goal",
+            "conversion",
+            "engagement",
+        ],
+        0.10,
+    ),
+}
+HEADING = re.compile(r"^[0-9]+\.\s", re.MULTILINE)
+
+
+class ScoringEngine:
+    """Precompiled form of a scoring rubric.
+
+    The document is lower-cased once and each distinct keyword is looked up
+    once, however many criteria share it. A combined-regex pass was measured
+    at about four times slower than these C-level substring searches, since
+    ``re`` tries every alternative at every position.
+    """
+
+    def __init__(self, criteria: Dict[str, Tuple[List[str], float]] = CRITERIA):
+        self.criteria = criteria
+        self.weights = [
+            (criterion, weight) for criterion, (_, weight) in criteria.items()
+        ]
+        self._keywords = tuple(
+            {word for words, _ in criteria.values() for word in words}
+        )
+
+    def _found(self, lowered: str) -> set:
+        return {word for word in self._keywords if word in lowered}
+
+    def score(self, prd_text: str) -> Dict[str, float]:
+        """Score one PRD; identical to the original per-keyword scan."""
+        found = self._found(prd_text.lower())
+        scores = {}
+        for criterion, (keywords, _) in self.criteria.items():
+            if criterion == "Consistency":
+                # Special handling for consistency - count section headers
+                headings = sum(1 for _ in HEADING.finditer(prd_text))
+                scores[criterion] = min(headings, 10)
+            else:
+                matches = sum(1 for word in keywords if word in found)
+                scores[criterion] = min(matches * 2, 10)
+        total_score = sum(
+            scores[criterion] * weight for criterion, weight in self.weights
+        )
+        scores["Total Score"] = round(total_score, 2)
+        return scores
+
+    def score_many(
+        self,
+        documents: Iterable[str],
+        processes: Optional[int] = None,
+        chunksize: int = 64,
+    ) -> "pd.DataFrame":
+        """Score many PRDs into a DataFrame with one column per criterion.
+
+        Documents may be any iterable, including a lazy generator; with
+        ``processes`` they are scored across a process pool in chunks.
+        """
+        if processes:
+            with ProcessPoolExecutor(processes) as pool:
+                rows = list(pool.map(self.score, documents, chunksize=chunksize))
+        else:
+            rows = [self.score(document) for document in documents]
+        import pandas as pd  # only batch scoring needs it; keeps page start-up light
+
+        columns = [*self.criteria, "Total Score"]
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+
+_engine = ScoringEngine()
+
+
+def score_prd(prd_text):
+    """Score PRD based on key metrics with simplified scoring."""
+    return _engine.score(prd_text)
+
+
+def score_prds(
+    documents: Iterable[str], processes: Optional[int] = None
+) -> "pd.DataFrame":
+    """Score a batch of PRDs with the default rubric."""
+    return _engine.score_many(documents, processes)
@@ -0,0 +1,160 @@
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import get_setting
+
+ALLOWED_FIELDS = {"transcript"}
+CHARS_PER_TOKEN = 4
+# Tokens left free in the context window for the model's answer
+OUTPUT_RESERVE = 8192
+CONTEXT_TOKENS = {
+    "Gemini": 1_048_576,
+    "TogetherAI": 131_072,
+}
+POLICIES = ("truncate", "summarize", "map_reduce")
+DEFAULT_POLICY = get_setting("PROMPT_BUDGET_POLICY", "truncate")
+if DEFAULT_POLICY not in POLICIES:
+    raise ValueError(
+        f"PROMPT_BUDGET_POLICY must be one of {', '.join(POLICIES)}, "
+        f"not {DEFAULT_POLICY!r}"
+    )
+# Concurrent LLM calls when a transcript is processed chunk by chunk
+MAP_WORKERS = int(get_setting("MAP_WORKERS", 4))
+
+SUMMARY_PROMPT = (
+    "Summarize this part of a meeting transcript. Keep every product "
+    "requirement, decision, constraint, metric and open question; drop "
+    "small talk.\n\n{transcript}"
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class TemplateError(ValueError):
+    """A prompt template is malformed or uses an unknown placeholder."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), computed locally."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def token_budget(model: str) -> int:
+    """Prompt tokens allowed for ``model``; set ``<MODEL>_TOKEN_BUDGET`` to override."""
+    default = CONTEXT_TOKENS.get(model, 32_768) - OUTPUT_RESERVE
+    return int(get_setting(f"{model.upper()}_TOKEN_BUDGET", default))
+
+
+class PromptTemplate:
+    """A prompt parsed once into literal text and placeholders.
+
+    Rendering joins the pre-split pieces instead of re-parsing the template
+    with ``str.format`` on every call, and unknown placeholders are rejected
+    when the template is compiled rather than when a request is sent.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        try:
+            parsed = list(Formatter().parse(content))
+        except ValueError as e:
+            raise TemplateError(f"Malformed prompt template: {e}") from None
+        for literal, field, spec, conversion in parsed:
+            if field is not None:
+                if field not in ALLOWED_FIELDS:
+                    raise TemplateError(f"Unknown placeholder {{{field}}}")
+                if spec or conversion:
+                    raise TemplateError(f"Unsupported format in {{{field}}}")
+            self._parts.append((literal, field))
+        self.fields = {field for _, field in self._parts if field}
+        self.overhead = estimate_tokens("".join(literal for literal, _ in self._parts))
+
+    def render(self, **values: str) -> str:
+        return "".join(
+            literal + (values[field] if field else "") for literal, field in self._parts
+        )
+
+
+@functools.lru_cache(maxsize=256)
+def compile_template(content: str) -> PromptTemplate:
+    return PromptTemplate(content)
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """Split ``text`` at sentence or line breaks into chunks of ``max_tokens``."""
+    limit = max(max_tokens, 1) * CHARS_PER_TOKEN
+    chunks, current = [], ""
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:limit])
+            sentence = sentence[limit:]
+        if current and len(current) + 1 + len(sentence) > limit:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Keep the start and end of ``text`` within ``max_tokens``, marking the cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    omitted = estimate_tokens(text) - max_tokens
+    marker = f"\n[... about {omitted} tokens omitted ...]\n"
+    keep = max(max_tokens * CHARS_PER_TOKEN - len(marker), 0)
+    head = keep * 2 // 3
+    return text[:head] + marker + text[len(text) - (keep - head) :]
+
+
+def fit_transcript(
+    template: PromptTemplate,
+    transcript: str,
+    budget: int,
+    policy: str = DEFAULT_POLICY,
+    complete: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Shrink ``transcript`` so the rendered ``template`` fits ``budget`` tokens.
+
+    - ``truncate`` drops the middle of the transcript.
+    - ``summarize`` summarizes budget-sized chunks with ``complete`` and
+      uses the joined summaries.
+    - ``map_reduce`` runs the template itself on each chunk and feeds the
+      joined partial answers back through it.
+    """
+    available = budget - template.overhead
+    if estimate_tokens(transcript) <= available:
+        return transcript
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown budget policy {policy!r}")
+    if policy == "truncate" or complete is None:
+        return truncate(transcript, available)
+    mapper = compile_template(SUMMARY_PROMPT) if policy == "summarize" else template
+    chunks = split_text(transcript, budget - mapper.overhead)
+    with ThreadPoolExecutor(MAP_WORKERS) as pool:
+        pieces = list(
+            pool.map(lambda chunk: complete(mapper.render(transcript=chunk)), chunks)
+        )
+    return truncate("\n\n".join(pieces), available)
+
+
+def render_prompt(
+    prompt: Dict,
+    transcript: str,
+    model: str,
+    policy: str = DEFAULT_POLICY,
+    complete: Optional[Callable[[str], str]] = None,
+) -> str:
+    """Render a library prompt with the transcript fitted to ``model``'s budget."""
+    template = compile_template(prompt["content"])
+    fitted = fit_transcript(template, transcript, token_budget(model), policy, complete)
+    return template.render(transcript=fitted)
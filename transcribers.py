@@ -0,0 +1,195 @@
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+from cache import cached_transcript
+from clients import get_client
+from config import get_secret, get_setting
+from fetch import (
+    audio_mimetype,
+    cancel_event,
+    check_cancelled,
+    open_audio,
+    upload_file,
+)
+from http_client import request
+from metrics import instrument, instrument_transcriber, report_audio_seconds
+from polling import DEFAULT_DEADLINE, PollError, get_callback_server, poll
+from ratelimit import rate_limited
+
+GLADIA_API_URL = get_setting("GLADIA_API_URL", "https://api.gladia.io")
+
+
+@instrument("api_request", "Gladia")
+def make_request(url, headers, method="GET", data=None, files=None):
+    if method == "POST":
+        response = request("POST", url, headers=headers, json=data, files=files)
+    else:
+        response = request("GET", url, headers=headers)
+    return response.json()
+
+
+@cached_transcript("Gladia")
+@rate_limited("Gladia")
+@instrument_transcriber("Gladia")
+def Gladia(uploaded_file):
+    # Set when a race is won elsewhere; stops the upload, submission and polling
+    cancel = cancel_event(uploaded_file)
+    headers = {
+        "x-gladia-key": get_secret("GLADIA_API_KEY"),  # Replace with your Gladia Token
+        "accept": "application/json",
+    }
+    print("- Uploading file to Gladia...")
+    with open_audio(uploaded_file) as audio:
+        upload_response = upload_file(
+            f"{GLADIA_API_URL}/v2/upload/",
+            headers,
+            "audio",
+            audio,
+            audio.name,
+            audio_mimetype(audio),
+        )
+    print("Upload response with File ID:", upload_response)
+    audio_url = upload_response.get("audio_url")
+    duration = upload_response.get("audio_metadata", {}).get("audio_duration")
+    if duration:
+        report_audio_seconds(duration)
+
+    data = {"audio_url": audio_url}
+    callback_url = get_setting("GLADIA_CALLBACK_URL")
+    server = None
+    if callback_url:
+        try:
+            server = get_callback_server(
+                int(get_setting("GLADIA_CALLBACK_PORT", 8765)),
+                get_setting("GLADIA_CALLBACK_HOST", "127.0.0.1"),
+            )
+        except OSError as e:
+            # Most likely another worker process holds the port
+            print(f"- Gladia webhook listener unavailable ({e}), polling instead")
+
+    headers["Content-Type"] = "application/json"
+
+    with server.expect() if server else nullcontext() as token:
+        if token:
+            data["callback"] = True
+            data["callback_config"] = {
+                "url": server.callback_url(callback_url, token),
+                "method": "POST",
+            }
+        check_cancelled(cancel, "Gladia")
+        print("- Sending request to Gladia API...")
+        post_response = make_request(
+            f"{GLADIA_API_URL}/v2/transcription/", headers, "POST", data=data
+        )
+
+        print("Post response with Transcription ID:", post_response)
+        result_url = post_response.get("result_url")
+        if not result_url:
+            raise PollError(f"Gladia did not accept the job: {post_response}")
+
+        # One deadline for the whole job, shared by the webhook wait and the poll
+        end = time.monotonic() + float(get_setting("GLADIA_DEADLINE", DEFAULT_DEADLINE))
+        if token:
+            # Wait for the webhook instead of polling; the poll below then only
+            # fetches the finished result (or takes over if the webhook never came)
+            server.wait(token, timeout=end - time.monotonic(), cancel=cancel)
+    reply = poll(
+        result_url,
+        headers,
+        duration=duration,
+        deadline=max(end - time.monotonic(), 0.0),
+        cancel=cancel,
+    )
+    return reply["result"]["transcription"]["full_transcript"]
+
+
+@cached_transcript("Deepgram")
+@rate_limited("Deepgram")
+@instrument_transcriber("Deepgram")
+def Deepgram(uploaded_file, input):
+    from deepgram import PrerecordedOptions
+
+    deepgram = get_client("deepgram")
+    # STEP 2 Call the transcribe_file method on the rest class
+    options = PrerecordedOptions(detect_language=True, model=input)
+    with open_audio(uploaded_file) as audio:
+        payload = {
+            "stream": audio,
+            "mimetype": audio_mimetype(audio, "video/webm"),
+        }
+        file_response = deepgram.listen.rest.v("1").transcribe_file(
+            payload, options, timeout=300
+        )
+    return file_response["results"]["channels"][0]["alternatives"][0]["transcript"]
+
+
+@cached_transcript("Assembly")
+@rate_limited("Assembly")
+@instrument_transcriber("Assembly")
+def Assembly(uploaded_file):
+    aai = get_client("assemblyai")
+    transcriber = aai.Transcriber()
+    config = aai.TranscriptionConfig(language_detection=True)
+    cancel = cancel_event(uploaded_file)
+    with open_audio(uploaded_file) as audio_file:
+        # Submit only and poll here, so a lost race stops polling at once
+        transcript = transcriber.submit(audio_file, config)
+    check_cancelled(cancel, "Assembly")
+    try:
+        reply = poll(
+            f"{aai.settings.base_url}/v2/transcript/{transcript.id}",
+            {"authorization": aai.settings.api_key},
+            done="completed",
+            cancel=cancel,
+        )
+    except PollError as e:
+        print(f"Transcription failed: {e}")
+        raise RuntimeError(f"Assembly transcription failed: {e}")
+    if reply.get("audio_duration"):
+        report_audio_seconds(reply["audio_duration"])
+    return reply["text"]
+
+
+@cached_transcript("Whisper", "whisper-1")
+@rate_limited("Whisper")
+@instrument_transcriber("Whisper")
+def Whisper(uploaded_file):
+    client = get_client("openai")
+    with open_audio(uploaded_file) as audio:
+        transcription = client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(audio.name, audio),
+        )
+    return transcription.text
+
+
+@cached_transcript("Groq", "whisper-large-v3-turbo")
+@rate_limited("Groq")
+@instrument_transcriber("Groq")
+def Groq(uploaded_file):
+    client = get_client("groq")
+    with open_audio(uploaded_file) as audio:
+        chat_completion = client.audio.transcriptions.create(
+            file=(audio.name, audio), model="whisper-large-v3-turbo"
+        )
+    return chat_completion.text
+
+
+@dataclass(frozen=True)
+class Provider:
+    """A transcription service and the extra arguments it takes after the audio."""
+
+    name: str
+    transcribe: Callable[..., str]
+    defaults: Tuple = ()
+
+
+PROVIDERS: Dict[str, Provider] = {
+    "Assembly": Provider("Assembly", Assembly),
+    "Deepgram": Provider("Deepgram", Deepgram, ("nova-2",)),
+    "Gladia": Provider("Gladia", Gladia),
+    "Groq": Provider("Groq", Groq),
+    "Whisper": Provider("Whisper", Whisper),
+}